@@ -0,0 +1,83 @@
+"""
+So sánh lượng bộ nhớ cấp phát mỗi frame của chuỗi tiền xử lý cũ
+(resize → MOG2 → threshold → clean_mask, mỗi bước tạo mảng mới) với PreprocessStage.
+
+    python -m benchmarks.bench_memory [--video path] [--frames 300]
+"""
+import argparse
+import tracemalloc
+
+import cv2
+import numpy as np
+
+from src.preprocessing.bg_subtractor import create_subtractor
+from src.preprocessing.thresholding import apply_threshold
+from src.preprocessing.morphology import clean_mask
+from src.preprocessing.stage import PreprocessStage
+from src.utils.config import FRAME_WIDTH, FRAME_HEIGHT
+
+
+def load_frames(video, count):
+    frames = []
+    if video:
+        cap = cv2.VideoCapture(video)
+        while len(frames) < count:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frames.append(frame)
+        cap.release()
+    if not frames:
+        rng = np.random.default_rng(0)
+        frames = [rng.integers(0, 255, (720, 1280, 3), dtype=np.uint8) for _ in range(8)]
+    return frames
+
+
+def legacy_chain():
+    subtractor = create_subtractor()
+
+    def run(frame):
+        frame = cv2.resize(frame, (FRAME_WIDTH, FRAME_HEIGHT))
+        return clean_mask(apply_threshold(subtractor.apply(frame)))
+    return run
+
+
+def pooled_chain():
+    stage = PreprocessStage((FRAME_WIDTH, FRAME_HEIGHT))
+    return lambda frame: stage.apply(frame)[1]
+
+
+def measure(run, frames, n_frames, warmup=20):
+    """Trả về (byte cấp phát trung bình mỗi frame, đỉnh tạm thời trung bình mỗi frame)"""
+    for i in range(warmup):
+        run(frames[i % len(frames)])
+
+    tracemalloc.start()
+    allocated = 0
+    peaks = 0
+    for i in range(n_frames):
+        snap_before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        run(frames[i % len(frames)])
+        current, peak = tracemalloc.get_traced_memory()
+        peaks += peak - snap_before
+        allocated += max(0, current - snap_before)
+    tracemalloc.stop()
+    return allocated / n_frames, peaks / n_frames
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--video", default=None)
+    parser.add_argument("--frames", type=int, default=300)
+    args = parser.parse_args()
+
+    frames = load_frames(args.video, 64)
+    for name, factory in (("legacy", legacy_chain), ("pooled", pooled_chain)):
+        retained, transient = measure(factory(), frames, args.frames)
+        print(f"{name:8s} transient/frame: {transient / 1024:9.1f} KiB   "
+              f"retained/frame: {retained / 1024:7.2f} KiB")
+
+
+if __name__ == "__main__":
+    main()
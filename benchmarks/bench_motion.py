@@ -0,0 +1,88 @@
+"""
+So sánh các mô hình nền (src/motion) với MOG2 trên cùng cảnh tổng hợp có đáp án:
+thời gian riêng của bước mô hình nền, FPS toàn pipeline và sai số đếm.
+
+    python -m benchmarks.bench_motion [--frames 400] [--tracker greedy]
+"""
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from benchmarks.synthetic import SceneSpec, ground_truth, iter_frames
+from src.motion.motion_mask import create_motion_model
+from src.pipeline.engine import PeopleCounterPipeline
+from src.utils.config import FRAME_WIDTH, FRAME_HEIGHT
+
+SCENES = [
+    SceneSpec("sparse_vga", width=640, height=480, density=0.02, noise=2, seed=1),
+    SceneSpec("dense_vga", width=640, height=480, density=0.06, noise=4, seed=2),
+    SceneSpec("noisy_vga", width=640, height=480, density=0.03, noise=12, seed=3),
+]
+
+# (tên hiển thị, backend, update_every, learning_rate)
+CONFIGS = [
+    ("mog2", "mog2", 1, None),
+    ("mog2/2", "mog2", 2, None),
+    ("mog2/4", "mog2", 4, None),
+    ("knn", "knn", 1, None),
+    ("knn/4", "knn", 4, None),
+    ("knn lr=.005", "knn", 1, 0.005),
+    ("running_avg", "running_avg", 1, None),
+    ("running_avg/4", "running_avg", 4, None),
+    ("frame_diff", "frame_diff", 1, None),
+]
+
+
+def bench_model(frames, backend, update_every, learning_rate):
+    """Thời gian trung vị (ms) của riêng model.apply trên frame đã resize"""
+    model = create_motion_model(backend, update_every, learning_rate)
+    fg = np.empty((FRAME_HEIGHT, FRAME_WIDTH), np.uint8)
+    samples = []
+    for frame in frames:
+        t0 = time.perf_counter()
+        model.apply(frame, fgmask=fg)
+        samples.append(time.perf_counter() - t0)
+    return float(np.median(samples)) * 1000
+
+
+def bench_pipeline(frames, truth, backend, update_every, learning_rate, tracker):
+    pipeline = PeopleCounterPipeline(tracker=tracker, motion=backend)
+    pipeline.preprocess.subtractor = create_motion_model(backend, update_every, learning_rate)
+    t0 = time.perf_counter()
+    for frame in frames:
+        pipeline.process(frame, draw=False)
+    seconds = time.perf_counter() - t0
+    counts = pipeline.line_counter.totals[0]
+    error = abs(int(counts[0]) - truth[0]) + abs(int(counts[1]) - truth[1])
+    return len(frames) / seconds, (int(counts[0]), int(counts[1])), error
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--frames", type=int, default=400)
+    parser.add_argument("--tracker", default="greedy")
+    args = parser.parse_args()
+
+    # so sánh trên một lõi (giống máy yếu), không để OpenCV dùng nhiều thread
+    cv2.setNumThreads(1)
+    for spec in SCENES:
+        spec = spec._replace(frames=args.frames)
+        frames = [cv2.resize(f, (FRAME_WIDTH, FRAME_HEIGHT)) for f in iter_frames(spec)]
+        truth = ground_truth(spec)
+        print(f"\n{spec.name}: {spec.frames} frames, đáp án in/out {truth[0]}/{truth[1]}")
+        print(f"{'backend':>14} {'model ms':>9} {'vs mog2':>8} {'pipeline fps':>13} "
+              f"{'in/out':>8} {'error':>6}")
+        base = None
+        for name, backend, update_every, learning_rate in CONFIGS:
+            model_ms = bench_model(frames, backend, update_every, learning_rate)
+            base = base or model_ms
+            fps, counts, error = bench_pipeline(frames, truth, backend, update_every,
+                                                learning_rate, args.tracker)
+            print(f"{name:>14} {model_ms:9.3f} {base / model_ms:7.2f}x {fps:13.1f} "
+                  f"{counts[0]:>4}/{counts[1]:<3} {error:6d}")
+
+
+if __name__ == "__main__":
+    main()
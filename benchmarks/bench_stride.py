@@ -0,0 +1,57 @@
+"""
+Sai số đếm theo stride (bỏ frame) của từng tracker trên cảnh tổng hợp có đáp án.
+Mỗi cảnh được sinh một lần, stride s chỉ đưa frame 0, s, 2s, ... vào pipeline
+(giống FramePrefetcher bỏ frame bằng grab()) với dt = s cho tracker.
+
+    python -m benchmarks.bench_stride [--frames 600] [--strides 1,2,3,4,6,8]
+"""
+import argparse
+
+import cv2
+
+from benchmarks.synthetic import SceneSpec, ground_truth, iter_frames
+from src.pipeline.engine import PeopleCounterPipeline
+from src.utils.config import FRAME_WIDTH, FRAME_HEIGHT
+
+SCENES = [
+    SceneSpec("sparse_vga", width=640, height=480, density=0.02, noise=2, seed=1),
+    SceneSpec("dense_vga", width=640, height=480, density=0.06, noise=4, seed=2),
+    SceneSpec("fast_vga", width=640, height=480, density=0.03, noise=2, seed=6, speed=(8, 14)),
+]
+
+TRACKERS = ("centroid", "greedy", "predictive")
+
+
+def count_with_stride(frames, stride, tracker):
+    pipeline = PeopleCounterPipeline(tracker=tracker)
+    for frame in frames[::stride]:
+        pipeline.process(frame, draw=False, dt=stride)
+    counts = pipeline.line_counter.totals[0]
+    return int(counts[0]), int(counts[1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--frames", type=int, default=600)
+    parser.add_argument("--strides", default="1,2,3,4,6,8")
+    args = parser.parse_args()
+    strides = [int(s) for s in args.strides.split(",")]
+
+    for spec in SCENES:
+        spec = spec._replace(frames=args.frames)
+        frames = [cv2.resize(f, (FRAME_WIDTH, FRAME_HEIGHT)) for f in iter_frames(spec)]
+        truth_in, truth_out = ground_truth(spec)
+        print(f"\n{spec.name}: đáp án in/out {truth_in}/{truth_out}, "
+              f"sai số |in - đáp án| + |out - đáp án|")
+        print(f"{'stride':>7} " + " ".join(f"{t:>16}" for t in TRACKERS))
+        for stride in strides:
+            cells = []
+            for tracker in TRACKERS:
+                count_in, count_out = count_with_stride(frames, stride, tracker)
+                error = abs(count_in - truth_in) + abs(count_out - truth_out)
+                cells.append(f"{count_in:>3}/{count_out:<3} err {error:<3}")
+            print(f"{stride:>7} " + " ".join(f"{c:>16}" for c in cells))
+
+
+if __name__ == "__main__":
+    main()
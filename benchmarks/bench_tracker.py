@@ -0,0 +1,74 @@
+"""
+So sánh CentroidTracker (greedy cdist, không gate) với GatedTracker (greedy/Hungarian
+có gate, trạng thái NumPy; "predictive" = greedy + dự đoán vận tốc) ở 10/100/500
+đối tượng di chuyển ngẫu nhiên.
+
+    python -m benchmarks.bench_tracker [--frames 200]
+
+In ra thời gian update() trung bình mỗi frame và tỉ lệ giữ đúng ID
+(phần trăm cặp frame liên tiếp mà đối tượng vẫn mang cùng ID).
+"""
+import argparse
+import time
+
+import numpy as np
+
+from src.tracking.tracker_factory import create_tracker
+
+
+def simulate(n_objects, n_frames, size=(1920, 1080), speed=4.0, seed=0):
+    """Danh sách box (đã xáo trộn) mỗi frame và nhãn thật tương ứng"""
+    rng = np.random.default_rng(seed)
+    w, h = size
+    pos = rng.uniform((0, 0), (w, h), (n_objects, 2))
+    vel = rng.normal(0, speed, (n_objects, 2))
+    frames = []
+    for _ in range(n_frames):
+        vel += rng.normal(0, speed * 0.1, vel.shape)
+        pos = np.clip(pos + vel, 0, (w - 1, h - 1))
+        order = rng.permutation(n_objects)
+        boxes = np.column_stack([pos[order] - 10, np.full((n_objects, 2), 20)]).astype(int)
+        frames.append((boxes, order))
+    return frames
+
+
+def run(backend, frames):
+    tracker = create_tracker(backend, max_disappear=5, max_distance=40)
+    prev_labels = None
+    kept = total = 0
+    start = time.perf_counter()
+    elapsed = 0.0
+    for boxes, order in frames:
+        t0 = time.perf_counter()
+        objects = tracker.update([tuple(b) for b in boxes.tolist()])
+        elapsed += time.perf_counter() - t0
+
+        # ánh xạ centroid → ID để tính tỉ lệ giữ ID (không tính vào thời gian)
+        by_pos = {c: i for i, c in objects.items()}
+        cents = (boxes[:, :2] + boxes[:, 2:] // 2)
+        labels = {}
+        for true_id, c in zip(order.tolist(), map(tuple, cents.tolist())):
+            labels[true_id] = by_pos.get(c)
+        if prev_labels is not None:
+            for true_id, obj_id in labels.items():
+                total += 1
+                kept += obj_id is not None and prev_labels.get(true_id) == obj_id
+        prev_labels = labels
+    return elapsed / len(frames), kept / max(total, 1), time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--frames", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'objects':>8} {'backend':>10} {'ms/frame':>10} {'id kept':>8}")
+    for n in (10, 100, 500):
+        frames = simulate(n, args.frames, seed=n)
+        for backend in ("centroid", "greedy", "hungarian", "predictive"):
+            per_frame, kept, _ = run(backend, frames)
+            print(f"{n:8d} {backend:>10} {per_frame * 1000:10.3f} {kept * 100:7.1f}%")
+
+
+if __name__ == "__main__":
+    main()
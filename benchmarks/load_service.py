@@ -0,0 +1,140 @@
+"""
+Kiểm tra tải cho dịch vụ mạng (src/service) chỉ với file video cục bộ: chạy cùng một video
+tổng hợp hai lần, không có client và có nhiều client WebSocket / MJPEG, trong đó một số
+client "treo" (kết nối nhưng không bao giờ đọc). Vòng xử lý chạy nhanh nhất có thể.
+
+Kiểm tra:
+- FPS của vòng xử lý khi có client không giảm quá --min-ratio so với khi không có client
+  (client treo không được làm chậm vòng xử lý);
+- mọi client WebSocket nhanh nhận đủ sự kiện đếm (= tổng in + out của mọi đường đếm);
+- mỗi frame xem trước chỉ được mã hóa JPEG một lần dù có nhiều người xem.
+
+    python -m benchmarks.load_service [--frames 1500] [--ws 20] [--mjpeg 10] [--stalled 10]
+
+Thoát với mã 1 nếu một kiểm tra thất bại.
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+from benchmarks.synthetic import SceneSpec, write_video
+from src.service.server import CounterService
+from src.service.websocket import OP_TEXT, read_frame
+
+
+async def ws_client(port, received, stalled=False):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(b"GET /events HTTP/1.1\r\nHost: localhost\r\nUpgrade: websocket\r\n"
+                 b"Connection: Upgrade\r\nSec-WebSocket-Key: dGhlIHNhbXBsZSBub25jZQ==\r\n"
+                 b"Sec-WebSocket-Version: 13\r\n\r\n")
+    if stalled:
+        writer.transport.pause_reading()
+        await asyncio.Event().wait()
+    await reader.readuntil(b"\r\n\r\n")
+    try:
+        while True:
+            opcode, payload = await read_frame(reader, max_payload=1 << 24)
+            if opcode == OP_TEXT:
+                event = json.loads(payload)
+                if event["type"] == "count":
+                    received.append(event)
+    finally:
+        writer.close()
+
+
+async def mjpeg_client(port, counter, index, stalled=False):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(b"GET /preview/0 HTTP/1.1\r\nHost: localhost\r\n\r\n")
+    if stalled:
+        writer.transport.pause_reading()
+        await asyncio.Event().wait()
+    try:
+        while True:
+            chunk = await reader.read(1 << 16)
+            if not chunk:
+                return
+            counter[index] += chunk.count(b"--frame\r\n")
+    finally:
+        writer.close()
+
+
+async def run_once(path, ws=0, mjpeg=0, stalled=0, preview_fps=10):
+    service = await CounterService([path], port=0, preview_fps=preview_fps,
+                                   realtime=False).start()
+    events = [[] for _ in range(ws)]
+    frames = [0] * mjpeg
+    tasks = [asyncio.create_task(ws_client(service.port, events[i])) for i in range(ws)]
+    tasks += [asyncio.create_task(mjpeg_client(service.port, frames, i)) for i in range(mjpeg)]
+    tasks += [asyncio.create_task(ws_client(service.port, [], stalled=True))
+              for _ in range(stalled)]
+    tasks += [asyncio.create_task(mjpeg_client(service.port, [0], 0, stalled=True))
+              for _ in range(stalled)]
+
+    start = time.perf_counter()
+    while not service.finished:
+        await asyncio.sleep(0.05)
+    seconds = time.perf_counter() - start
+    await asyncio.sleep(2 * 1.0)       # cho các sự kiện cuối được gửi hết
+    stats = service.stats()
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    await service.stop()
+
+    stream = stats["streams"][0]
+    crossings = sum(sum(counts.values()) for counts in stream["lines"].values())
+    return {"fps": stream["frames"] / seconds, "seconds": seconds, "crossings": crossings,
+            "events": [len(e) for e in events], "mjpeg_frames": frames,
+            "encoded": stream["preview_encoded"], "dropped": stats["events_dropped"]}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--frames", type=int, default=1500)
+    parser.add_argument("--ws", type=int, default=20)
+    parser.add_argument("--mjpeg", type=int, default=10)
+    parser.add_argument("--stalled", type=int, default=10,
+                        help="số client treo mỗi loại (WebSocket và MJPEG)")
+    parser.add_argument("--preview-fps", type=float, default=10)
+    parser.add_argument("--min-ratio", type=float, default=0.7)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = write_video(SceneSpec("service", frames=args.frames, density=0.04, seed=4),
+                           os.path.join(tmp, "service.avi"))
+        base = asyncio.run(run_once(path))
+        print(f"no clients: {base['fps']:.1f} fps, {base['crossings']} crossings")
+        loaded = asyncio.run(run_once(path, args.ws, args.mjpeg, args.stalled, args.preview_fps))
+    delivered = sum(loaded["mjpeg_frames"])
+    print(f"{args.ws} ws + {args.mjpeg} mjpeg + {2 * args.stalled} stalled: "
+          f"{loaded['fps']:.1f} fps ({loaded['fps'] / base['fps']:.0%}), "
+          f"{loaded['crossings']} crossings")
+    print(f"  ws events per client: min {min(loaded['events'], default=0)} "
+          f"max {max(loaded['events'], default=0)}, dropped (stalled clients) "
+          f"{loaded['dropped']}")
+    print(f"  preview: {loaded['encoded']} JPEG encodes, {delivered} frames delivered "
+          f"to {args.mjpeg} fast viewers")
+
+    failed = []
+    if loaded["fps"] < args.min_ratio * base["fps"]:
+        failed.append(f"FPS giảm còn {loaded['fps'] / base['fps']:.0%} khi có client")
+    if any(n != loaded["crossings"] for n in loaded["events"]):
+        failed.append("client WebSocket nhanh không nhận đủ sự kiện đếm")
+    if loaded["crossings"] != base["crossings"]:
+        failed.append("số đếm khác nhau giữa hai lần chạy")
+    max_encodes = loaded["seconds"] * args.preview_fps + 2
+    if loaded["encoded"] > max_encodes:
+        failed.append(f"{loaded['encoded']} lần mã hóa JPEG > {max_encodes:.0f}")
+    if args.mjpeg and min(loaded["mjpeg_frames"]) == 0:
+        failed.append("có người xem MJPEG không nhận được frame nào")
+    if failed:
+        print("FAIL: " + "; ".join(failed))
+        raise SystemExit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+"""
+Bộ benchmark trên cảnh tổng hợp có đáp án.
+
+    python -m benchmarks.run_suite [--frames 400] [--quick] [--tracker greedy]
+                                   [--label v2] [--baseline benchmarks/results/x.json]
+
+Với mỗi cảnh: chạy toàn bộ pipeline (throughput, latency p50/p95/p99, bộ nhớ đỉnh,
+sai số so với đáp án) và từng bước riêng lẻ (subtractor, threshold, morphology,
+detect_people, blob_filter, tracker, counter). Kết quả lưu JSON trong benchmarks/results/ và
+được so sánh với lần chạy trước để phát hiện regression.
+"""
+import argparse
+import glob
+import json
+import os
+import platform
+import subprocess
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+from benchmarks.synthetic import SceneSpec, ground_truth, iter_frames
+from src.counting.line_counter import CountingLine, LineCounter
+from src.detection.blob_filter import BlobFilter
+from src.detection.contour_detector import detect_people
+from src.pipeline.engine import PeopleCounterPipeline
+from src.preprocessing.bg_subtractor import create_subtractor
+from src.preprocessing.morphology import MorphologyChain
+from src.preprocessing.thresholding import apply_threshold
+from src.tracking.tracker_factory import create_tracker
+from src.utils.config import FRAME_WIDTH, FRAME_HEIGHT, TRACKER_BACKEND
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+SCENES = [
+    SceneSpec("sparse_vga", width=640, height=480, density=0.02, noise=2, seed=1),
+    SceneSpec("dense_vga", width=640, height=480, density=0.06, noise=4, seed=2),
+    SceneSpec("noisy_vga", width=640, height=480, density=0.03, noise=12, seed=3),
+    SceneSpec("sparse_hd", width=1280, height=720, density=0.02, noise=2, seed=4),
+    SceneSpec("dense_fhd", width=1920, height=1080, density=0.06, noise=4, seed=5),
+]
+
+STAGE_SAMPLE = 150        # số frame giữ lại để đo từng bước riêng lẻ
+MEMORY_SAMPLE = 100       # số frame đo bộ nhớ đỉnh (tracemalloc làm chậm nên đo riêng)
+
+# Sai lệch cho phép trước khi báo regression
+FPS_TOLERANCE = 0.10
+
+
+def latency_stats(samples, frames=None):
+    samples = np.asarray(samples) * 1000.0
+    total = samples.sum() / 1000.0
+    return {
+        "fps": (frames or len(samples)) / total if total > 0 else 0.0,
+        "p50_ms": float(np.percentile(samples, 50)),
+        "p95_ms": float(np.percentile(samples, 95)),
+        "p99_ms": float(np.percentile(samples, 99)),
+    }
+
+
+def timed(fn, inputs):
+    samples = []
+    for item in inputs:
+        t0 = time.perf_counter()
+        fn(item)
+        samples.append(time.perf_counter() - t0)
+    return latency_stats(samples)
+
+
+def bench_pipeline(spec, tracker):
+    pipeline = PeopleCounterPipeline(tracker=tracker)
+    samples = []
+    sample = []
+    for frame in iter_frames(spec):
+        t0 = time.perf_counter()
+        pipeline.process(frame, draw=False)
+        samples.append(time.perf_counter() - t0)
+        if len(sample) < STAGE_SAMPLE:
+            sample.append(frame)
+
+    truth_in, truth_out = ground_truth(spec)
+    counts = pipeline.line_counter.totals
+    stats = latency_stats(samples)
+    stats.update({
+        "count_in": int(counts[0, 0]), "truth_in": truth_in,
+        "count_out": int(counts[0, 1]), "truth_out": truth_out,
+        "abs_error": abs(int(counts[0, 0]) - truth_in) + abs(int(counts[0, 1]) - truth_out),
+    })
+    return stats, sample
+
+
+def bench_memory(spec, tracker):
+    pipeline = PeopleCounterPipeline(tracker=tracker)
+    frames = iter_frames(spec._replace(frames=min(spec.frames, MEMORY_SAMPLE)))
+    first = next(frames)
+    tracemalloc.start()
+    pipeline.process(first, draw=False)
+    for frame in frames:
+        pipeline.process(frame, draw=False)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 1024
+
+
+def bench_stages(frames, tracker):
+    """Đo từng bước riêng lẻ trên đầu vào đã được chuẩn bị từ bước trước"""
+    size = (FRAME_WIDTH, FRAME_HEIGHT)
+    resized = [cv2.resize(f, size) for f in frames]
+
+    subtractor = create_subtractor()
+    fg = [subtractor.apply(f) for f in resized]
+    th = [apply_threshold(m) for m in fg]
+    chain = MorphologyChain()
+    clean = [chain.apply(m).copy() for m in th]
+    boxes = [detect_people(m) for m in clean]
+
+    trk = create_tracker(tracker)
+    objects = [dict(trk.update(b)) for b in boxes]
+    pairs = list(zip(objects[1:], objects[:-1]))
+
+    stages = {}
+    stages["resize"] = timed(lambda f: cv2.resize(f, size), frames)
+    subtractor = create_subtractor()
+    stages["subtractor"] = timed(subtractor.apply, resized)
+    stages["threshold"] = timed(apply_threshold, fg)
+    chain = MorphologyChain()
+    stages["morphology"] = timed(chain.apply, th)
+    stages["detect_people"] = timed(detect_people, clean)
+    stages["blob_filter"] = timed(BlobFilter().detect, clean)
+    trk = create_tracker(tracker)
+    stages["tracker"] = timed(trk.update, boxes)
+    counter = LineCounter([CountingLine.horizontal(FRAME_HEIGHT // 2, FRAME_WIDTH)])
+    stages["counter"] = timed(lambda p: counter.update(*p), pairs)
+    return stages
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def latest_result(exclude=None):
+    files = sorted(glob.glob(os.path.join(RESULTS_DIR, "*.json")), key=os.path.getmtime)
+    files = [f for f in files if f != exclude]
+    return files[-1] if files else None
+
+
+def compare(current, baseline):
+    """In so sánh với lần chạy trước; trả về số regression phát hiện được"""
+    regressions = 0
+    for name, scene in current["scenes"].items():
+        old = baseline["scenes"].get(name)
+        if not old:
+            continue
+        new_p, old_p = scene["pipeline"], old["pipeline"]
+        ratio = new_p["fps"] / old_p["fps"] if old_p["fps"] else 1.0
+        flags = []
+        if ratio < 1 - FPS_TOLERANCE:
+            flags.append("FPS")
+        if new_p["abs_error"] > old_p["abs_error"]:
+            flags.append("ACCURACY")
+        regressions += bool(flags)
+        print(f"  {name:12s} fps {old_p['fps']:8.1f} → {new_p['fps']:8.1f} ({ratio:5.2f}x)  "
+              f"error {old_p['abs_error']} → {new_p['abs_error']}"
+              + (f"   REGRESSION: {', '.join(flags)}" if flags else ""))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--frames", type=int, default=400)
+    parser.add_argument("--quick", action="store_true", help="ít frame, chỉ 2 cảnh đầu")
+    parser.add_argument("--tracker", default=TRACKER_BACKEND)
+    parser.add_argument("--label", default=None, help="tên file kết quả")
+    parser.add_argument("--baseline", default=None, help="file kết quả để so sánh")
+    args = parser.parse_args()
+
+    cv2.setRNGSeed(0)
+    scenes = SCENES[:2] if args.quick else SCENES
+    n_frames = 150 if args.quick else args.frames
+
+    result = {
+        "meta": {
+            "label": args.label, "git": git_revision(), "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "python": platform.python_version(), "opencv": cv2.__version__,
+            "numpy": np.__version__, "tracker": args.tracker, "frames": n_frames,
+        },
+        "scenes": {},
+    }
+
+    for spec in scenes:
+        spec = spec._replace(frames=n_frames)
+        pipeline_stats, sample = bench_pipeline(spec, args.tracker)
+        pipeline_stats["peak_kib"] = bench_memory(spec, args.tracker)
+        stages = bench_stages(sample, args.tracker)
+        result["scenes"][spec.name] = {"spec": spec._asdict(), "pipeline": pipeline_stats,
+                                       "stages": stages}
+
+        p = pipeline_stats
+        print(f"{spec.name:12s} {spec.width}x{spec.height}  {p['fps']:7.1f} fps  "
+              f"p50 {p['p50_ms']:6.2f} ms  p95 {p['p95_ms']:6.2f} ms  p99 {p['p99_ms']:6.2f} ms  "
+              f"peak {p['peak_kib']:8.0f} KiB  in {p['count_in']}/{p['truth_in']}  "
+              f"out {p['count_out']}/{p['truth_out']}")
+        print("             " + "  ".join(f"{k} {v['p50_ms']:.3f}ms" for k, v in stages.items()))
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    label = args.label or time.strftime("%Y%m%d-%H%M%S")
+    path = os.path.join(RESULTS_DIR, f"{label}.json")
+    baseline_path = args.baseline or latest_result(exclude=path)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2)
+    print(f"Saved {path}")
+
+    if baseline_path:
+        with open(baseline_path, encoding="utf-8") as f:
+            baseline = json.load(f)
+        print(f"Compared with {baseline_path}:")
+        if compare(result, baseline):
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
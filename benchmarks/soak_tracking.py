@@ -0,0 +1,127 @@
+"""
+Soak test bộ nhớ cho tracker + LineCounter khi chạy liên tục (24/7): hàng triệu frame
+detection tổng hợp (không decode video) với người đi qua đường đếm liên tục và
+detection bị mất ngẫu nhiên. Kiểm tra RSS sau giai đoạn khởi động không tăng quá
+--max-growth MiB và ID lớn nhất được cấp vẫn nhỏ (ID được dùng lại).
+
+    python -m benchmarks.soak_tracking [--frames 2000000] [--tracker greedy]
+
+Thoát với mã 1 nếu bộ nhớ hoặc ID tăng quá giới hạn.
+"""
+import argparse
+import os
+import resource
+import time
+
+import numpy as np
+
+from src.counting.line_counter import CountingLine, LineCounter
+from src.tracking.tracker_factory import create_tracker
+
+WIDTH, HEIGHT = 640, 480
+PERSON_W, PERSON_H = 50, 90
+
+
+def rss_mib():
+    """RSS hiện tại (Linux: /proc/self/statm), nơi khác dùng RSS đỉnh"""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError, AttributeError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class Crowd:
+    """Người đi thẳng từ trên xuống / dưới lên qua khung hình, trạng thái trong mảng"""
+
+    def __init__(self, rate=0.05, miss=0.05, seed=0):
+        self.rng = np.random.default_rng(seed)
+        self.rate = rate          # xác suất có người mới mỗi frame
+        self.miss = miss          # xác suất mất detection của mỗi người mỗi frame
+        self.pos = np.empty((0, 2))
+        self.vel = np.empty((0, 2))
+        self.crossings = 0        # số lần đi qua đường giữa (đáp án gần đúng)
+
+    def step(self):
+        rng = self.rng
+        if rng.random() < self.rate:
+            down = rng.random() < 0.5
+            x = rng.uniform(0, WIDTH - PERSON_W)
+            y = -PERSON_H if down else HEIGHT
+            speed = rng.uniform(3, 7) * (1 if down else -1)
+            self.pos = np.vstack([self.pos, (x, y)])
+            self.vel = np.vstack([self.vel, (rng.uniform(-0.5, 0.5), speed)])
+
+        before = self.pos[:, 1] + PERSON_H / 2
+        self.pos += self.vel
+        after = self.pos[:, 1] + PERSON_H / 2
+        line = HEIGHT // 2
+        self.crossings += int(np.count_nonzero((before < line) & (after >= line)) +
+                              np.count_nonzero((before > line) & (after <= line)))
+
+        inside = (self.pos[:, 1] > -PERSON_H) & (self.pos[:, 1] < HEIGHT)
+        self.pos, self.vel = self.pos[inside], self.vel[inside]
+
+        seen = rng.random(len(self.pos)) >= self.miss
+        boxes = np.empty((int(seen.sum()), 4), np.int64)
+        boxes[:, :2] = self.pos[seen]
+        boxes[:, 2:] = (PERSON_W, PERSON_H)
+        return boxes
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--frames", type=int, default=2_000_000)
+    parser.add_argument("--tracker", default="greedy")
+    parser.add_argument("--sample-every", type=int, default=100_000)
+    parser.add_argument("--warmup", type=float, default=0.1,
+                        help="phần frame đầu bỏ qua khi đo tăng trưởng bộ nhớ")
+    parser.add_argument("--max-growth", type=float, default=8.0, help="MiB")
+    parser.add_argument("--max-id", type=int, default=1000)
+    args = parser.parse_args()
+
+    crowd = Crowd()
+    tracker = create_tracker(args.tracker, max_disappear=10)
+    counter = LineCounter([CountingLine.horizontal(HEIGHT // 2, WIDTH)])
+    old_objects = {}
+
+    warmup_frames = int(args.frames * args.warmup)
+    baseline = peak = None
+    start = time.perf_counter()
+    print(f"{'frame':>10} {'rss MiB':>8} {'max id':>7} {'tracks':>7} {'counted':>8} "
+          f"{'retired':>8} {'count':>8} {'truth':>8}")
+    for frame in range(1, args.frames + 1):
+        objects = tracker.update(crowd.step())
+        counter.update(objects, old_objects)
+        old_objects = objects
+
+        if frame % args.sample_every == 0 or frame == args.frames:
+            rss = rss_mib()
+            if frame >= warmup_frames:
+                baseline = rss if baseline is None else baseline
+                peak = rss if peak is None else max(peak, rss)
+            ids = tracker.id_manager
+            print(f"{frame:10d} {rss:8.1f} {ids.high_water:7d} {len(objects):7d} "
+                  f"{len(counter.counted):8d} {ids.retired:8d} "
+                  f"{int(counter.totals.sum()):8d} {crowd.crossings:8d}")
+
+    seconds = time.perf_counter() - start
+    growth = peak - baseline
+    high_water = tracker.id_manager.high_water
+    print(f"{args.frames} frames in {seconds:.0f}s ({args.frames / seconds:.0f} fps), "
+          f"RSS growth after warmup {growth:.2f} MiB, max id {high_water}")
+
+    failed = []
+    if growth > args.max_growth:
+        failed.append(f"RSS tăng {growth:.2f} MiB > {args.max_growth} MiB")
+    if high_water > args.max_id:
+        failed.append(f"ID lớn nhất {high_water} > {args.max_id}")
+    if failed:
+        print("FAIL: " + "; ".join(failed))
+        raise SystemExit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Sinh video tổng hợp có đáp án: các "người" (hình elip tối màu) đi qua đường đếm
+theo quỹ đạo biết trước. Cùng seed → cùng video, cùng số đếm đúng.
+"""
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+# density: xác suất xuất hiện người mới mỗi frame; noise: độ lệch chuẩn nhiễu ảnh
+# speed: (min, max) tốc độ đi bộ, px / frame theo tọa độ 640x480
+SceneSpec = namedtuple("SceneSpec", ["name", "frames", "width", "height", "density",
+                                     "noise", "seed", "down_ratio", "speed"])
+SceneSpec.__new__.__defaults__ = (500, 640, 480, 0.03, 4.0, 0, 0.8, (3, 7))
+
+# Kích thước người và vị trí đường đếm theo tọa độ chuẩn hóa 640x480 của pipeline
+PERSON_W, PERSON_H = 50, 90
+LINE_Y = 240
+
+
+def plan_trajectories(spec):
+    """Quỹ đạo của mọi người trong cảnh: list (frame xuất hiện, x, y0, vx, vy)"""
+    rng = np.random.default_rng(spec.seed)
+    people = []
+    for t in range(spec.frames):
+        if rng.random() < spec.density:
+            x = rng.uniform(20, 640 - PERSON_W - 20)
+            speed = rng.uniform(*spec.speed)
+            if rng.random() < spec.down_ratio:
+                people.append((t, x, -PERSON_H, rng.uniform(-0.5, 0.5), speed))
+            else:
+                people.append((t, x, 480, rng.uniform(-0.5, 0.5), -speed))
+    return people
+
+
+def ground_truth(spec, line_y=LINE_Y):
+    """(số người đi xuống qua đường - "in", số người đi lên - "out") trong video"""
+    down = up = 0
+    for t0, _, y0, _, vy in plan_trajectories(spec):
+        last = spec.frames - 1 - t0
+        # tâm đi từ y0 + h/2 đến y0 + h/2 + vy * last
+        c0 = y0 + PERSON_H / 2
+        c1 = c0 + vy * last
+        if vy > 0 and c0 < line_y <= c1:
+            down += 1
+        elif vy < 0 and c1 <= line_y < c0:
+            up += 1
+    return down, up
+
+
+def iter_frames(spec):
+    """Sinh lần lượt từng frame BGR kích thước (width, height)"""
+    rng = np.random.default_rng(spec.seed + 1)
+    people = plan_trajectories(spec)
+    sx, sy = spec.width / 640, spec.height / 480
+    background = np.full((480, 640, 3), 200, np.uint8)
+    cv2.rectangle(background, (0, 440), (640, 480), (170, 170, 170), -1)
+    background = cv2.resize(background, (spec.width, spec.height))
+
+    # Một bộ nhiễu cố định dùng xoay vòng (nhanh hơn sinh nhiễu mới mỗi frame)
+    noise_bank = [rng.normal(0, spec.noise, background.shape).astype(np.int16)
+                  for _ in range(8)] if spec.noise else None
+
+    for t in range(spec.frames):
+        frame = background.copy()
+        for t0, x, y0, vx, vy in people:
+            if t < t0:
+                continue
+            dt = t - t0
+            cx = (x + vx * dt + PERSON_W / 2) * sx
+            cy = (y0 + vy * dt + PERSON_H / 2) * sy
+            if -PERSON_H * sy < cy < (480 + PERSON_H) * sy:
+                cv2.ellipse(frame, (int(cx), int(cy)),
+                            (int(PERSON_W / 2 * sx), int(PERSON_H / 2 * sy)),
+                            0, 0, 360, (40, 40, 40), -1)
+        if noise_bank:
+            frame = np.clip(frame + noise_bank[t % len(noise_bank)], 0, 255).astype(np.uint8)
+        yield frame
+
+
+def write_video(spec, path, fps=25):
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), fps,
+                             (spec.width, spec.height))
+    for frame in iter_frames(spec):
+        writer.write(frame)
+    writer.release()
+    return path
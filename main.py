@@ -1,80 +1,269 @@
+import argparse
+import os
+import time
+
 import cv2
-from src.preprocessing.bg_subtractor import create_subtractor
-from src.preprocessing.thresholding import apply_threshold
-from src.preprocessing.morphology import clean_mask
-from src.detection.contour_detector import detect_people
-from src.tracking.centroid_tracker import CentroidTracker
-from src.counting.people_counter import count_people
-from src.utils.drawer import draw_line, draw_box
-from src.utils.config import VIDEO_PATH
+from src.counting.event_store import create_event_store
+from src.pipeline.engine import PeopleCounterPipeline, run_headless
+from src.pipeline.capture import open_source, read_with_stride
+from src.pipeline.scheduler import create_scheduler
+from src.pipeline.multi_stream import run_streams
+from src.pipeline.chunked import DEFAULT_WARMUP, run_chunked
+from src.pipeline.staged import DEFAULT_SLOTS, run_staged
+from src.service.server import run_service
+from src.pipeline.sweep import INTEGER_FIELDS, SweepConfig, format_table, run_sweep
+from src.utils.config import (VIDEO_PATH, ROI_MARGIN, PROCESS_SCALE, TRACKER_BACKEND,
+                              METRICS_ENABLED, METRICS_DIR, METRICS_INTERVAL,
+                              DETECTOR_BACKEND, MOTION_BACKEND, LATENCY_BUDGET_MS,
+                              DETECTION_CACHE_DIR, SERVICE_HOST, SERVICE_PORT,
+                              PREVIEW_MAX_FPS, EVENT_STORE_DIR)
+from src.detection.detector_factory import DETECTOR_BACKENDS
+from src.motion.motion_mask import MOTION_BACKENDS
+from src.utils.logger import create_metrics
+from src.tracking.tracker_factory import TRACKER_BACKENDS
 from src.visualization.app_ui import run_ui
 
-# Kích thước cố định video (nếu muốn)
-FRAME_WIDTH = 640
-FRAME_HEIGHT = 480
 
-def main():
-    cap = cv2.VideoCapture(VIDEO_PATH)
-    subtractor = create_subtractor()
-    tracker = CentroidTracker()
+def main(video_path=VIDEO_PATH, budget_ms=LATENCY_BUDGET_MS, pipeline=None):
+    cap = open_source(video_path)
+    if pipeline is None:
+        pipeline = PeopleCounterPipeline()
+        pipeline.resume(video_path)
+    scheduler = create_scheduler(pipeline, budget_ms)
 
-    counted_ids = set()
-    total = 0
-    old_objects = {}
+    while True:
+        stride = scheduler.stride if scheduler else 1
+        ret, frame = read_with_stride(cap, stride)
+        if not ret:
+            break
 
-    # Lấy LINE_Y sau khi đọc frame đầu tiên
-    ret, frame = cap.read()
-    if not ret:
-        print("Không thể đọc video")
-        return
+        t0 = time.perf_counter()
+        result = pipeline.process(frame, dt=stride)
+        if scheduler:
+            scheduler.observe(time.perf_counter() - t0)
+        frame = result.frame
 
-    # Resize frame nếu muốn
-    frame = cv2.resize(frame, (FRAME_WIDTH, FRAME_HEIGHT))
-    LINE_Y = FRAME_HEIGHT // 2
+        cv2.putText(frame, f"Count: {pipeline.total}", (20, 40),
+                    cv2.FONT_HERSHEY_SIMPLEX, 1.2, (0,255,0), 3)
 
-    # reset video về đầu để vòng lặp chính đọc từ đầu
-    cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+        cv2.imshow("People Counter", frame)
 
-    while True:
-        ret, frame = cap.read()
-        if not ret:
+        if cv2.waitKey(1) & 0xFF == 27:
             break
 
-        frame = cv2.resize(frame, (FRAME_WIDTH, FRAME_HEIGHT))
+    cap.release()
+    cv2.destroyAllWindows()
+    pipeline.metrics.export()
 
-        fg_mask = subtractor.apply(frame)
-        th = apply_threshold(fg_mask)
-        clean = clean_mask(th)
 
-        boxes = detect_people(clean)
-        objects = tracker.update(boxes)
+def pipeline_options(args):
+    """
+    Tham số PeopleCounterPipeline theo các tùy chọn dòng lệnh (dùng chung cho mọi chế độ).
+    Chỉ gồm giá trị pickle được, để gửi sang process con (--streams, --chunked).
+    """
+    return {"roi_margin": args.roi_margin, "scale": args.scale, "tracker": args.tracker,
+            "lines": args.lines, "detector": args.detector, "motion": args.motion}
 
-        # đếm
-        total += count_people(objects, old_objects, LINE_Y, counted_ids)
-        old_objects = objects.copy()
 
-        # vẽ
-        draw_line(frame, LINE_Y)
+def build_pipeline(args, events=None, metrics=True):
+    """PeopleCounterPipeline theo các tùy chọn dòng lệnh, trong process hiện tại"""
+    return PeopleCounterPipeline(**pipeline_options(args), events=events,
+                                 metrics=create_metrics(args.metrics and metrics,
+                                                        args.metrics_dir, METRICS_INTERVAL))
 
-        for obj_id, (cx, cy) in objects.items():
-            for box in boxes:
-                bx, by, bw, bh = box
-                if bx < cx < bx+bw and by < cy < by+bh:
-                    draw_box(frame, box, obj_id)
 
-        cv2.putText(frame, f"Count: {total}", (20, 40), 
-                    cv2.FONT_HERSHEY_SIMPLEX, 1.2, (0,255,0), 3)
+def parse_line(text):
+    # "x1,y1,x2,y2[,x3,y3...]" → [(x1, y1), (x2, y2), ...]
+    values = [int(v) for v in text.split(",")]
+    if len(values) < 4 or len(values) % 2:
+        raise argparse.ArgumentTypeError("đường đếm cần dạng x1,y1,x2,y2[,...]")
+    return list(zip(values[0::2], values[1::2]))
 
-        cv2.imshow("People Counter", frame)
-        # cv2.imshow("Mask", clean)
 
-        if cv2.waitKey(1) & 0xFF == 27:
-            break
+def parse_truth(text):
+    # "IN" hoặc "IN,OUT" → (in, out | None)
+    values = [int(v) for v in text.split(",")]
+    if len(values) not in (1, 2):
+        raise argparse.ArgumentTypeError("số đếm đúng cần dạng IN hoặc IN,OUT")
+    return values[0], values[1] if len(values) == 2 else None
+
+
+def parse_grid(text):
+    # "min_area=1500,2500" → ("min_area", (1500, 2500))
+    name, _, values = text.partition("=")
+    if name not in SweepConfig._fields or not values:
+        raise argparse.ArgumentTypeError(
+            f"cần dạng KEY=V1,V2,... với KEY thuộc {', '.join(SweepConfig._fields)}")
+    try:
+        parsed = tuple(float(v) if "." in v else int(v) for v in values.split(","))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"giá trị không phải số: {values}")
+    if name in INTEGER_FIELDS and any(int(v) != v for v in parsed):
+        raise argparse.ArgumentTypeError(f"{name} cần giá trị nguyên: {values}")
+    return name, parsed
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="People Counter")
+    parser.add_argument("--video", default=VIDEO_PATH,
+                        help="đường dẫn video hoặc chỉ số camera")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--show", action="store_true",
+                      help="chạy vòng lặp cv2.imshow thay vì giao diện Tk")
+    mode.add_argument("--headless", action="store_true",
+                      help="xử lý không hiển thị, nhanh nhất có thể")
+    mode.add_argument("--staged", action="store_true",
+                      help="headless, decode và mô hình nền chạy trên process riêng "
+                           "(một luồng độ phân giải cao dùng nhiều lõi)")
+    mode.add_argument("--streams", nargs="+", metavar="SOURCE",
+                      help="xử lý nhiều video/camera song song trên pool process")
+    mode.add_argument("--chunked", action="store_true",
+                      help="chia một video dài thành nhiều đoạn, xử lý song song")
+    mode.add_argument("--serve", nargs="*", metavar="SOURCE",
+                      help="dịch vụ HTTP/WebSocket: sự kiện đếm + xem trước MJPEG "
+                           "(không có SOURCE thì dùng --video)")
+    mode.add_argument("--sweep", action="store_true",
+                      help="quét lưới tham số trên video có số đếm đúng (--truth)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="số process (mặc định = số lõi CPU)")
+    parser.add_argument("--chunks", type=int, default=None,
+                        help="số đoạn khi dùng --chunked (mặc định = số process)")
+    parser.add_argument("--warmup", type=int, default=DEFAULT_WARMUP,
+                        help="số frame warm-up trước mỗi đoạn")
+    parser.add_argument("--verify", action="store_true",
+                        help="chạy thêm bản tuần tự để so sánh kết quả --chunked")
+    parser.add_argument("--slots", type=int, default=DEFAULT_SLOTS,
+                        help="số slot của mỗi ring buffer shared memory (--staged)")
+    parser.add_argument("--host", default=SERVICE_HOST)
+    parser.add_argument("--port", type=int, default=SERVICE_PORT)
+    parser.add_argument("--preview-fps", type=float, default=PREVIEW_MAX_FPS,
+                        help="FPS tối đa của ảnh xem trước MJPEG (--serve)")
+    parser.add_argument("--loop", action="store_true",
+                        help="hết file video thì chạy lại từ đầu (--serve)")
+    parser.add_argument("--truth", type=parse_truth, metavar="IN[,OUT]",
+                        help="số đếm đúng của video cho --sweep")
+    parser.add_argument("--grid", type=parse_grid, action="append", default=[],
+                        metavar="KEY=V1,V2,...",
+                        help="thay giá trị quét của một tham số (--sweep), có thể lặp lại")
+    parser.add_argument("--top", type=int, default=20,
+                        help="số cấu hình tốt nhất in ra khi --sweep")
+    parser.add_argument("--max-frames", type=int, default=None)
+    parser.add_argument("--stride", type=int, default=1,
+                        help="chỉ xử lý 1 frame trong mỗi N frame (headless)")
+    parser.add_argument("--budget", type=float, default=LATENCY_BUDGET_MS, metavar="MS",
+                        help="ngân sách mỗi frame (ms): tự giảm morphology / độ phân giải / "
+                             "bỏ frame khi xử lý không kịp (--show, --headless)")
+    parser.add_argument("--cache", default=DETECTION_CACHE_DIR, metavar="DIR",
+                        help="cache detection theo frame: lần sau chỉ chạy lại tracking + đếm "
+                             "(headless, file video)")
+    parser.add_argument("--events", default=EVENT_STORE_DIR, metavar="DIR",
+                        help="lưu mọi lần đi qua đường đếm + tổng theo phút / giờ, tổng đếm "
+                             "được khôi phục khi chạy lại (--show, --headless, --staged, --serve)")
+    parser.add_argument("--no-prefetch", action="store_true",
+                        help="đọc frame trên cùng thread thay vì thread nền")
+    parser.add_argument("--roi-margin", type=int, default=ROI_MARGIN,
+                        help="chỉ xử lý dải ±N px quanh đường đếm")
+    parser.add_argument("--scale", type=float, default=PROCESS_SCALE,
+                        help="tỉ lệ thu nhỏ ảnh trước khi xử lý, ví dụ 0.5")
+    parser.add_argument("--detector", choices=DETECTOR_BACKENDS, default=DETECTOR_BACKEND,
+                        help="cách tách blob: findContours hoặc connected components")
+    parser.add_argument("--motion", choices=MOTION_BACKENDS, default=MOTION_BACKEND,
+                        help="mô hình nền (running_avg / frame_diff nhẹ hơn MOG2)")
+    parser.add_argument("--tracker", choices=TRACKER_BACKENDS, default=TRACKER_BACKEND,
+                        help="thuật toán tracking")
+    parser.add_argument("--line", type=parse_line, action="append", dest="lines",
+                        metavar="X1,Y1,X2,Y2[,...]",
+                        help="thêm đường đếm (đoạn thẳng hoặc gấp khúc), có thể lặp lại")
+    parser.add_argument("--metrics", action="store_true", default=METRICS_ENABLED,
+                        help="đo thời gian từng bước, xuất metrics.jsonl và metrics.prom")
+    parser.add_argument("--metrics-dir", default=METRICS_DIR)
+    parser.add_argument("--report-every", type=int, default=0,
+                        help="in tiến độ sau mỗi N frame (headless)")
+    args = parser.parse_args(argv)
+    if args.sweep and args.truth is None:
+        parser.error("--sweep cần --truth IN[,OUT]")
+    return args
 
-    cap.release()
-    cv2.destroyAllWindows()
 
 if __name__ == "__main__":
-    # if len(sys.argv) > 1 and sys.argv[1] == "--ui":
+    args = parse_args()
+    if args.headless or args.staged:
+        events = create_event_store(args.events)
+        pipeline = build_pipeline(args, events)
+        pipeline.resume(args.video)
+        if args.staged:
+            stats = run_staged(args.video, max_frames=args.max_frames, pipeline=pipeline,
+                               stride=args.stride, slots=args.slots,
+                               report_every=args.report_every)
+        else:
+            stats = run_headless(args.video, max_frames=args.max_frames, pipeline=pipeline,
+                                 report_every=args.report_every, stride=args.stride,
+                                 prefetch=not args.no_prefetch, budget_ms=args.budget,
+                                 cache_dir=args.cache)
+        if events:
+            events.close()
+        print(f"Frames: {stats['frames']}  Time: {stats['seconds']:.2f}s  "
+              f"FPS: {stats['fps']:.1f}  Count: {stats['total']}"
+              + ("  (from detection cache)" if stats.get("cached") else ""))
+        for name, counts in stats["lines"].items():
+            print(f"  {name}: " + "  ".join(f"{d}={n}" for d, n in counts.items()))
+        for name, stage in stats.get("stages", {}).items():
+            print(f"  stage {name}: {stage['frames']} frames, busy {stage['busy']:.2f}s "
+                  f"({stage['utilization']:.0%})")
+    elif args.streams:
+        def print_update(stream_id, totals, total):
+            print(f"stream {stream_id}: {totals[stream_id]}  |  total: {total}")
+
+        result = run_streams(args.streams, workers=args.workers,
+                             max_frames=args.max_frames, on_update=print_update,
+                             pipeline_options=pipeline_options(args),
+                             metrics_dir=args.metrics_dir if args.metrics else None)
+        for stats in result["streams"]:
+            print(f"{stats['source']}: frames={stats['frames']}  "
+                  f"count={stats['total']}")
+        print(f"Total: {result['total']}")
+    elif args.chunked:
+        result = run_chunked(args.video, chunks=args.chunks, warmup=args.warmup,
+                             workers=args.workers, pipeline_options=pipeline_options(args),
+                             metrics_dir=args.metrics_dir if args.metrics else None)
+        print(f"Frames: {result['frames']}  Time: {result['seconds']:.2f}s  "
+              f"FPS: {result['fps']:.1f}  Count: {result['total']}")
+        if args.verify:
+            # cùng cấu hình với các chunk (metrics đã ghi theo từng chunk)
+            sequential = run_headless(args.video,
+                                      pipeline=build_pipeline(args, metrics=False))
+            print(f"Sequential count: {sequential['total']}  "
+                  f"(diff {result['total'] - sequential['total']:+d})")
+    elif args.serve is not None:
+        stores = []
+
+        def make_pipeline():
+            # mỗi luồng một thư mục sự kiện riêng: stream-0, stream-1... (theo thứ tự nguồn)
+            events = create_event_store(
+                args.events and os.path.join(args.events, f"stream-{len(stores)}"))
+            stores.append(events)
+            # các luồng chạy cùng process: metrics ghi chung một file nên không bật ở đây
+            return build_pipeline(args, events, metrics=False)
+
+        run_service(args.serve or [args.video], args.host, args.port,
+                    preview_fps=args.preview_fps, pipeline_factory=make_pipeline,
+                    loop_video=args.loop)
+        for events in filter(None, stores):
+            events.close()
+    elif args.sweep:
+        truth_in, truth_out = args.truth
+        result = run_sweep(args.video, truth_in, truth_out, grid=dict(args.grid),
+                           tracker=args.tracker, lines=args.lines, workers=args.workers,
+                           max_frames=args.max_frames)
+        print(f"{result['configs']} configs on {result['workers']} workers "
+              f"in {result['seconds']:.1f}s")
+        print(format_table(result["results"], args.top))
+    elif args.show:
+        events = create_event_store(args.events)
+        pipeline = build_pipeline(args, events)
+        pipeline.resume(args.video)
+        main(args.video, args.budget, pipeline)
+        if events:
+            events.close()
+    else:
         run_ui()
-    
\ No newline at end of file
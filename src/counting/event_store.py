@@ -0,0 +1,309 @@
+"""
+Lưu mọi lần đi qua đường đếm xuống đĩa để số đếm không mất khi khởi động lại và biết
+được người đi qua lúc nào.
+
+Thư mục store gồm:
+    events-000001.jsonl ...  sự kiện thô, mỗi dòng {"time", "source", "frame", "track",
+                             "line", "direction"}; file mới khi file hiện tại vượt max_bytes
+    checkpoint.json          tổng theo nguồn / đường / hướng, frame cuối đã ghi của mỗi
+                             nguồn, tổng theo phút và theo giờ, vị trí (file, offset) trong
+                             log tại thời điểm checkpoint
+
+Nguồn được định danh bằng source_key(): file video theo dấu vân tay nội dung (chạy lại
+cùng một file nhận ra được dù đổi đường dẫn), camera / stream theo tên.
+
+record() chỉ thêm sự kiện vào bộ đệm trong bộ nhớ (không I/O, không chờ); thread nền ghi
+theo lô mỗi flush_interval giây (hoặc khi bộ đệm đủ batch_size), cập nhật tổng theo
+phút / giờ tăng dần, và ghi checkpoint mỗi checkpoint_interval giây. Truy vấn báo cáo
+(aggregates) đọc các tổng này, không quét lại sự kiện thô.
+
+Sau khi crash: nạp checkpoint rồi đọc lại phần log được ghi sau checkpoint, nên tổng
+được khôi phục đúng tới lô cuối đã ghi (tối đa flush_interval giây sự kiện chưa ghi bị mất).
+Dòng cuối ghi dở (crash giữa lúc ghi) bị cắt bỏ.
+"""
+import json
+import os
+import threading
+import time
+
+from src.pipeline.detection_cache import video_fingerprint
+from src.utils.logger import get_logger
+
+_PREFIX, _SUFFIX = "events-", ".jsonl"
+_BUCKETS = {"minute": 60, "hour": 3600}
+
+
+def source_key(source):
+    """Khóa nguồn trong store: "file:<dấu vân tay>" cho file video, "live:<tên>" cho nguồn khác"""
+    if os.path.isfile(str(source)):
+        return "file:" + video_fingerprint(str(source))
+    return f"live:{source}"
+
+
+def is_file_key(key):
+    return key.startswith("file:")
+
+
+def _add(table, key, line, direction):
+    counts = table.setdefault(key, {}).setdefault(line, {})
+    counts[direction] = counts.get(direction, 0) + 1
+
+
+class CountEventStore:
+    """
+    keep_files: số file log thô giữ lại (None = giữ tất cả; tổng đã nằm trong checkpoint
+    nên xóa file cũ không làm mất số đếm). minute_retention: số phút gần nhất giữ tổng
+    theo phút (tổng theo giờ giữ mãi).
+    """
+
+    def __init__(self, directory, flush_interval=1.0, batch_size=1000, max_bytes=16 << 20,
+                 keep_files=None, checkpoint_interval=60.0, minute_retention=2 * 24 * 60,
+                 fsync=True):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_bytes = max_bytes
+        self.keep_files = keep_files
+        self.checkpoint_interval = checkpoint_interval
+        self.minute_retention = minute_retention
+        self.fsync = fsync
+        self.log = get_logger("event_store")
+
+        self.totals = {}            # nguồn → đường → hướng → tổng từ trước tới nay
+        self.last_frame = {}        # nguồn → chỉ số frame lớn nhất đã có sự kiện
+        self._flushed_frames = {}   # như last_frame nhưng chỉ tính sự kiện đã ghi xuống đĩa
+        self.buckets = {name: {} for name in _BUCKETS}   # đầu bucket (giây) → đường → hướng → n
+        self.events = 0             # số sự kiện đã ghi xuống đĩa
+        self._lock = threading.Lock()
+        self._pending = []
+        self._wake = threading.Event()
+        self._flushed = threading.Condition()
+        self._requested = self._completed = 0
+        self._stop = False
+
+        os.makedirs(directory, exist_ok=True)
+        self._recover()
+        self._file = open(self._path(self._seq), "ab")
+        self._last_checkpoint = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name="event-store", daemon=True)
+        self._thread.start()
+
+    # ----- ghi -----
+
+    def record(self, timestamp, source, frame, crossings):
+        """
+        Gọi từ vòng xử lý: thêm mọi lần đi qua (track, đường, hướng) của một frame vào
+        bộ đệm (cùng một lô, nên frame không bao giờ được ghi dở).
+        """
+        with self._lock:
+            self._pending.extend((timestamp, source, frame, track, line, direction)
+                                 for track, line, direction in crossings)
+            if frame > self.last_frame.get(source, -1):
+                self.last_frame[source] = frame
+            full = len(self._pending) >= self.batch_size
+        if full:
+            self._wake.set()
+
+    def flush(self, timeout=None):
+        """Chờ tới khi mọi sự kiện đã record() được ghi xuống đĩa"""
+        with self._flushed:
+            self._requested += 1
+            target = self._requested
+            self._wake.set()
+            return self._flushed.wait_for(lambda: self._completed >= target, timeout)
+
+    def close(self):
+        self._stop = True
+        self._wake.set()
+        self._thread.join()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            stop = self._stop
+            with self._flushed:
+                requested = self._requested
+            try:
+                self._write_batch()
+                if stop or time.monotonic() - self._last_checkpoint >= self.checkpoint_interval:
+                    self._checkpoint()
+            except OSError:
+                # giữ thread chạy: lô lỗi đã được đưa lại vào bộ đệm, thử lại lần sau
+                self.log.exception("cannot write count events to %s", self.directory)
+            with self._flushed:
+                self._completed = requested
+                self._flushed.notify_all()
+            if stop:
+                return
+
+    def _write_batch(self):
+        with self._lock:
+            batch, self._pending = self._pending, []
+        if not batch:
+            return
+        data = "".join(
+            json.dumps({"time": t, "source": src, "frame": f, "track": k, "line": l,
+                        "direction": d}, separators=(",", ":")) + "\n"
+            for t, src, f, k, l, d in batch).encode()
+        try:
+            self._file.write(data)
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+        except OSError:
+            with self._lock:
+                self._pending[:0] = batch
+            raise
+        with self._lock:
+            for t, source, frame, _, line, direction in batch:
+                self._apply(t, source, line, direction)
+                if frame > self._flushed_frames.get(source, -1):
+                    self._flushed_frames[source] = frame
+            self.events += len(batch)
+        if self._file.tell() >= self.max_bytes:
+            self._rotate()
+
+    def _apply(self, timestamp, source, line, direction):
+        counts = self.totals.setdefault(source, {}).setdefault(line, {})
+        counts[direction] = counts.get(direction, 0) + 1
+        for name, size in _BUCKETS.items():
+            _add(self.buckets[name], int(timestamp // size) * size, line, direction)
+
+    def _rotate(self):
+        self._file.close()
+        self._seq += 1
+        self._file = open(self._path(self._seq), "ab")
+        # checkpoint ngay để lần khôi phục sau không phải đọc lại file cũ
+        self._checkpoint()
+        if self.keep_files:
+            for seq in self._sequences()[:-self.keep_files]:
+                os.remove(self._path(seq))
+
+    def _checkpoint(self):
+        with self._lock:
+            # bỏ tổng theo phút quá cũ trước khi ghi
+            oldest = (time.time() // 60 - self.minute_retention) * 60
+            minutes = self.buckets["minute"]
+            for key in [k for k in minutes if k < oldest]:
+                del minutes[key]
+            state = {"version": 2, "events": self.events, "totals": self.totals,
+                     "last_frame": self._flushed_frames, "buckets": self.buckets,
+                     "position": {"seq": self._seq, "offset": self._file.tell()}}
+            data = json.dumps(state, separators=(",", ":")).encode()
+        path = os.path.join(self.directory, "checkpoint.json")
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        os.replace(tmp, path)
+        self._last_checkpoint = time.monotonic()
+
+    # ----- khôi phục -----
+
+    def _path(self, seq):
+        return os.path.join(self.directory, f"{_PREFIX}{seq:06d}{_SUFFIX}")
+
+    def _sequences(self):
+        seqs = []
+        for name in os.listdir(self.directory):
+            if name.startswith(_PREFIX) and name.endswith(_SUFFIX):
+                try:
+                    seqs.append(int(name[len(_PREFIX):-len(_SUFFIX)]))
+                except ValueError:
+                    continue
+        return sorted(seqs)
+
+    def _recover(self):
+        seqs = self._sequences()
+        self._seq = seqs[-1] if seqs else 1
+        position = {"seq": 0, "offset": 0}
+        path = os.path.join(self.directory, "checkpoint.json")
+        if os.path.isfile(path):
+            with open(path, "rb") as f:
+                state = json.load(f)
+            self.events = state["events"]
+            self.totals = state["totals"]
+            self._flushed_frames = state["last_frame"]
+            # khóa JSON là chuỗi → đổi lại thành số giây
+            self.buckets = {name: {int(k): v for k, v in state["buckets"].get(name, {}).items()}
+                            for name in _BUCKETS}
+            position = state["position"]
+
+        replayed = 0
+        for seq in seqs:
+            if seq < position["seq"]:
+                continue
+            offset = position["offset"] if seq == position["seq"] else 0
+            replayed += self._replay(self._path(seq), offset, truncate=seq == seqs[-1])
+        self.last_frame = dict(self._flushed_frames)
+        if replayed or position["seq"]:
+            self.log.info("resumed %d events (%d replayed from log) from %s",
+                          self.events, replayed, self.directory)
+
+    def _replay(self, path, offset, truncate):
+        """Cộng các sự kiện sau offset vào tổng; cắt dòng ghi dở ở cuối file đang ghi"""
+        with open(path, "rb") as f:
+            f.seek(offset)
+            data = f.read()
+        end = data.rfind(b"\n") + 1
+        if truncate and end < len(data):
+            with open(path, "r+b") as f:
+                f.truncate(offset + end)
+        n = 0
+        for raw in data[:end].splitlines():
+            try:
+                event = json.loads(raw)
+            except ValueError:
+                continue
+            source = event["source"]
+            self._apply(event["time"], source, event["line"], event["direction"])
+            if event["frame"] > self._flushed_frames.get(source, -1):
+                self._flushed_frames[source] = event["frame"]
+            n += 1
+        self.events += n
+        return n
+
+    # ----- truy vấn -----
+
+    def line_totals(self, source=None):
+        """
+        {đường: {hướng: tổng}} từ trước tới nay (gồm cả các lần chạy trước)
+        của một nguồn, hoặc cộng mọi nguồn nếu source=None.
+        """
+        with self._lock:
+            sources = [self.totals.get(source, {})] if source is not None else self.totals.values()
+            result = {}
+            for lines in sources:
+                for line, counts in lines.items():
+                    for direction, n in counts.items():
+                        merged = result.setdefault(line, {})
+                        merged[direction] = merged.get(direction, 0) + n
+            return result
+
+    def aggregates(self, bucket="minute", start=None, end=None):
+        """
+        [(đầu bucket (epoch giây), {đường: {hướng: n}})] theo thời gian tăng dần,
+        trong [start, end) nếu có. Chỉ gồm sự kiện đã ghi xuống đĩa (xem flush()).
+        """
+        if bucket not in _BUCKETS:
+            raise ValueError(f"bucket phải là một trong {', '.join(_BUCKETS)}")
+        with self._lock:
+            table = self.buckets[bucket]
+            keys = sorted(k for k in table
+                          if (start is None or k >= start) and (end is None or k < end))
+            return [(k, {line: dict(c) for line, c in table[k].items()}) for k in keys]
+
+
+def create_event_store(directory, **kwargs):
+    """CountEventStore nếu có thư mục, ngược lại None (không lưu sự kiện)"""
+    return CountEventStore(directory, **kwargs) if directory else None
@@ -0,0 +1,130 @@
+import numpy as np
+
+
+class CountingLine:
+    """
+    Đường đếm là một đoạn thẳng hoặc đường gấp khúc (polyline).
+    directions = (tên hướng sang phía dương, tên hướng sang phía âm).
+    Phía dương là bên phải khi đi từ điểm đầu đến điểm cuối (tọa độ ảnh, trục y hướng xuống):
+    với đường ngang vẽ từ trái sang phải, "in" là đi từ trên xuống dưới (giống count_people).
+    """
+
+    def __init__(self, points, name=None, directions=("in", "out")):
+        self.points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        if len(self.points) < 2:
+            raise ValueError("Đường đếm cần ít nhất 2 điểm")
+        self.name = name
+        self.directions = tuple(directions)
+
+    @classmethod
+    def horizontal(cls, y, width, name="line"):
+        return cls([(0, y), (width, y)], name=name)
+
+
+class LineCounter:
+    """
+    Đếm số lần track đi qua nhiều đường đếm, theo cả hai hướng.
+    Mỗi frame, toàn bộ chuyển động (vị trí cũ → vị trí mới) của mọi track được
+    kiểm tra với mọi đoạn thẳng của mọi đường trong một lần tính NumPy.
+    Mỗi ID chỉ được đếm một lần cho mỗi đường và mỗi hướng; trạng thái đã đếm của
+    một ID được xóa khi tracker hủy track đó (TrackSet.removed) nên không tăng mãi.
+    """
+
+    def __init__(self, lines):
+        self.lines = list(lines)
+        for i, line in enumerate(self.lines):
+            if line.name is None:
+                line.name = f"line{i}"
+
+        starts, ends, seg_line = [], [], []
+        self.line_starts = []
+        for i, line in enumerate(self.lines):
+            self.line_starts.append(len(starts))
+            starts.extend(line.points[:-1])
+            ends.extend(line.points[1:])
+            seg_line.extend([i] * (len(line.points) - 1))
+
+        self.seg_a = np.array(starts)                  # (S, 2)
+        self.seg_d = np.array(ends) - self.seg_a       # (S, 2) vector hướng của đoạn
+        self.seg_line = np.array(seg_line)
+        self.reset()
+
+    def reset(self):
+        self.totals = np.zeros((len(self.lines), 2), np.int64)
+        self.counted = {}        # obj_id → bitmask các (đường, hướng) đã đếm
+
+    def forget(self, ids):
+        """Xóa trạng thái đã đếm của các ID đã bị hủy (ID có thể được cấp lại sau đó)"""
+        for obj_id in ids:
+            self.counted.pop(obj_id, None)
+
+    def update(self, objects, old_objects):
+        """
+        objects / old_objects: {id: (cx, cy)} của frame hiện tại và frame trước.
+        Trả về (số đếm trong frame dạng mảng (số đường, 2), list (id, chỉ số đường, hướng)).
+        Hướng 0 = directions[0] ("in"), 1 = directions[1] ("out").
+        """
+        frame_counts = np.zeros((len(self.lines), 2), np.int64)
+        removed = getattr(objects, "removed", ())
+        if removed:
+            self.forget(removed)
+        if hasattr(objects, "matched"):
+            # TrackSet: ghép ID cũ / mới thẳng trên mảng, không dựng dict
+            ids, prev, curr = objects.matched(old_objects)
+        else:
+            ids = [obj_id for obj_id in objects if obj_id in old_objects]
+            prev = [old_objects[i] for i in ids]
+            curr = [objects[i] for i in ids]
+        if not len(ids):
+            return frame_counts, []
+
+        prev = np.asarray(prev, dtype=np.float64)   # (T, 2)
+        curr = np.asarray(curr, dtype=np.float64)
+        move = curr - prev
+
+        # Vị trí cũ/mới nằm phía nào của mỗi đoạn: tích có hướng (T, S)
+        ax, ay = self.seg_a[:, 0], self.seg_a[:, 1]
+        dx, dy = self.seg_d[:, 0], self.seg_d[:, 1]
+        side_prev = dx * (prev[:, 1, None] - ay) - dy * (prev[:, 0, None] - ax)
+        side_curr = dx * (curr[:, 1, None] - ay) - dy * (curr[:, 0, None] - ax)
+
+        # Hai đầu đoạn nằm hai phía của đường di chuyển (chạm đầu mút cũng tính)
+        mx, my = move[:, 0, None], move[:, 1, None]
+        end_a = mx * (ay - prev[:, 1, None]) - my * (ax - prev[:, 0, None])
+        end_b = mx * (ay + dy - prev[:, 1, None]) - my * (ax + dx - prev[:, 0, None])
+        spans = end_a * end_b <= 0
+
+        # Giống count_people: trước đó ở hẳn một phía, hiện tại ở phía kia hoặc nằm trên đường
+        hit_in = spans & (side_prev < 0) & (side_curr >= 0)
+        hit_out = spans & (side_prev > 0) & (side_curr <= 0)
+
+        # Gộp các đoạn của cùng một đường (polyline) → (T, số đường)
+        hit_in = np.logical_or.reduceat(hit_in, self.line_starts, axis=1)
+        hit_out = np.logical_or.reduceat(hit_out, self.line_starts, axis=1)
+
+        crossings = []
+        for direction, hits in ((0, hit_in), (1, hit_out)):
+            for t, line_idx in zip(*np.nonzero(hits)):
+                obj_id, line_idx = ids[t], int(line_idx)
+                bit = 1 << (2 * line_idx + direction)
+                done = self.counted.get(obj_id, 0)
+                if done & bit:
+                    continue
+                self.counted[obj_id] = done | bit
+                frame_counts[line_idx, direction] += 1
+                crossings.append((obj_id, line_idx, direction))
+
+        self.totals += frame_counts
+        return frame_counts, crossings
+
+    def restore(self, results):
+        """Đặt lại tổng từ dạng của results() (ví dụ từ CountEventStore khi khởi động lại)"""
+        for i, line in enumerate(self.lines):
+            counts = results.get(line.name, {})
+            self.totals[i] = [counts.get(line.directions[0], 0), counts.get(line.directions[1], 0)]
+
+    def results(self):
+        """{tên đường: {tên hướng: tổng số}}"""
+        return {line.name: {line.directions[0]: int(self.totals[i, 0]),
+                            line.directions[1]: int(self.totals[i, 1])}
+                for i, line in enumerate(self.lines)}
@@ -0,0 +1,61 @@
+import cv2
+import numpy as np
+
+from src.utils.config import MIN_AREA, BLOB_MAX_AREA, BLOB_ASPECT, BLOB_MIN_FILL
+
+
+class BlobFilter:
+    """
+    Phát hiện blob bằng connectedComponentsWithStats: diện tích, box và centroid
+    của mọi blob có trong một lần gọi, sau đó lọc bằng các điều kiện vectorized.
+
+    Lưu ý: diện tích ở đây là số pixel của blob, lớn hơn một chút so với
+    cv2.contourArea (diện tích đa giác đi qua tâm các pixel biên).
+
+    - min_area / max_area: giới hạn diện tích (px, theo tọa độ frame hiển thị)
+    - aspect: (min, max) của tỉ lệ cao/rộng
+    - min_fill: tỉ lệ tối thiểu giữa diện tích blob và diện tích box
+    - region: (x0, y0, x1, y1) centroid phải nằm trong vùng này (tọa độ hiển thị)
+    """
+
+    def __init__(self, min_area=MIN_AREA, max_area=BLOB_MAX_AREA, aspect=BLOB_ASPECT,
+                 min_fill=BLOB_MIN_FILL, region=None, connectivity=8):
+        self.min_area = min_area
+        self.max_area = max_area
+        self.aspect = aspect
+        self.min_fill = min_fill
+        self.region = region
+        self.connectivity = connectivity
+        self._labels = None
+
+    def detect(self, mask, scale=1.0, offset=(0, 0)):
+        """Trả về mảng (N, 4) int32 các box (x, y, w, h) theo tọa độ frame hiển thị"""
+        if self._labels is None or self._labels.shape != mask.shape:
+            self._labels = np.empty(mask.shape, np.int32)
+        # CCL_GRANA (BBDT) nhanh hơn thuật toán mặc định khi chạy 1 thread
+        _, _, stats, centroids = cv2.connectedComponentsWithStatsWithAlgorithm(
+            mask, self.connectivity, cv2.CV_32S, cv2.CCL_GRANA, labels=self._labels)
+
+        # bỏ nhãn 0 (nền), đổi về tọa độ frame hiển thị
+        inv = 1.0 / scale
+        boxes = stats[1:, :4] * inv
+        boxes[:, :2] += offset
+        area = stats[1:, cv2.CC_STAT_AREA] * (inv * inv)
+        cents = centroids[1:] * inv + offset
+
+        w = boxes[:, 2]
+        h = boxes[:, 3]
+        keep = area >= self.min_area
+        if self.max_area is not None:
+            keep &= area <= self.max_area
+        if self.aspect is not None:
+            ratio = h / np.maximum(w, 1)
+            keep &= (ratio >= self.aspect[0]) & (ratio <= self.aspect[1])
+        if self.min_fill is not None:
+            keep &= area >= self.min_fill * w * h
+        if self.region is not None:
+            x0, y0, x1, y1 = self.region
+            keep &= ((cents[:, 0] >= x0) & (cents[:, 0] < x1) &
+                     (cents[:, 1] >= y0) & (cents[:, 1] < y1))
+
+        return boxes[keep].astype(np.int32)
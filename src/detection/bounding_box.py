@@ -0,0 +1,11 @@
+def to_frame_coords(boxes, scale=1.0, offset=(0, 0)):
+    # Đổi box từ tọa độ ảnh đã crop/thu nhỏ về tọa độ frame hiển thị
+    ox, oy = offset
+    if scale == 1.0:
+        if ox == 0 and oy == 0:
+            return boxes
+        return [(x + ox, y + oy, w, h) for x, y, w, h in boxes]
+
+    inv = 1.0 / scale
+    return [(int(x * inv) + ox, int(y * inv) + oy, int(w * inv), int(h * inv))
+            for x, y, w, h in boxes]
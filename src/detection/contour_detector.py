@@ -1,12 +1,12 @@
 import cv2
 from src.utils.config import MIN_AREA
 
-def detect_people(mask):
+def detect_people(mask, min_area=MIN_AREA):
     contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
 
     boxes = []
     for cnt in contours:
-        if cv2.contourArea(cnt) < MIN_AREA:
+        if cv2.contourArea(cnt) < min_area:
             continue
         x, y, w, h = cv2.boundingRect(cnt)
         boxes.append((x, y, w, h))
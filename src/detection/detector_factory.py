@@ -0,0 +1,25 @@
+from src.detection.blob_filter import BlobFilter
+from src.detection.bounding_box import to_frame_coords
+from src.detection.contour_detector import detect_people
+from src.utils.config import DETECTOR_BACKEND, MIN_AREA
+
+DETECTOR_BACKENDS = ("contours", "components")
+
+
+class ContourDetector:
+    """detect_people() với cùng giao diện detect(mask, scale, offset) như BlobFilter"""
+
+    def __init__(self, min_area=MIN_AREA):
+        self.min_area = min_area
+
+    def detect(self, mask, scale=1.0, offset=(0, 0)):
+        boxes = detect_people(mask, self.min_area * scale * scale)
+        return to_frame_coords(boxes, scale, offset)
+
+
+def create_detector(backend=DETECTOR_BACKEND, min_area=MIN_AREA):
+    if backend == "contours":
+        return ContourDetector(min_area)
+    if backend == "components":
+        return BlobFilter(min_area)
+    raise ValueError(f"Detector không hỗ trợ: {backend}")
@@ -0,0 +1,12 @@
+from src.preprocessing.morphology import DEFAULT_STEPS
+
+# Chuỗi morphology mặc định theo từng mô hình nền.
+# frame_diff chỉ thấy mép của vật đang di chuyển (hai vệt mỏng trên/dưới người):
+# bỏ bước open (sẽ xóa mất các vệt này), đóng + nở để nối chúng thành một blob.
+MOTION_STEPS = {
+    "frame_diff": (("close", 3), ("dilate", 3), ("close", 2)),
+}
+
+
+def default_steps(backend):
+    return MOTION_STEPS.get(backend, DEFAULT_STEPS)
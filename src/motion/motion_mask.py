@@ -0,0 +1,129 @@
+"""
+Các mô hình nền (background model) dùng thay cho MOG2 trên máy yếu.
+
+Mọi backend có cùng giao diện với subtractor của OpenCV:
+    mask = model.apply(frame, fgmask=None)
+trả về mask uint8 cùng kích thước frame, pixel > model.threshold là tiền cảnh.
+MOG2/KNN đánh dấu bóng = 127 nên ngưỡng là 135; các backend dựa trên hiệu ảnh
+trả về |frame - nền| (ảnh xám) nên ngưỡng thấp hơn nhiều.
+
+update_every = N: chỉ cập nhật mô hình nền mỗi N frame (các frame còn lại chỉ so sánh).
+"""
+import cv2
+import numpy as np
+
+from src.motion.thresholding import DIFF_THRESHOLD, SHADOW_THRESHOLD
+from src.preprocessing.bg_subtractor import create_subtractor
+from src.utils.config import MOTION_BACKEND, MOTION_UPDATE_EVERY, MOTION_LEARNING_RATE
+
+MOTION_BACKENDS = ("mog2", "knn", "running_avg", "frame_diff")
+
+
+class OpenCVSubtractor:
+    """MOG2 / KNN của OpenCV với learning rate tùy chọn và nhịp cập nhật thưa hơn"""
+
+    threshold = SHADOW_THRESHOLD
+
+    def __init__(self, subtractor, learning_rate=None, update_every=1, frozen_rate=0):
+        self.subtractor = subtractor
+        # None → -1: OpenCV tự chọn (1 / số frame đã thấy, tối đa 1 / history)
+        self.learning_rate = -1 if learning_rate is None else learning_rate
+        self.update_every = update_every
+        self.frozen_rate = frozen_rate   # learning rate ở các frame không cập nhật
+        self._count = 0
+
+    def apply(self, frame, fgmask=None):
+        update = self._count % self.update_every == 0
+        self._count += 1
+        rate = self.learning_rate if update else self.frozen_rate
+        return self.subtractor.apply(frame, fgmask=fgmask, learningRate=rate)
+
+
+class _GrayModel:
+    """Phần chung của các backend hiệu ảnh: chuyển xám + làm mờ vào buffer có sẵn"""
+
+    threshold = DIFF_THRESHOLD
+
+    def __init__(self, update_every=1, blur=5):
+        self.update_every = update_every
+        self.blur = blur
+        self._count = 0
+        self._gray = None
+
+    def _to_gray(self, frame, dst):
+        if dst is None or dst.shape != frame.shape[:2]:
+            dst = np.empty(frame.shape[:2], np.uint8)
+        cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=dst)
+        if self.blur:
+            cv2.GaussianBlur(dst, (self.blur, self.blur), 0, dst=dst)
+        return dst
+
+    def _should_update(self):
+        update = self._count % self.update_every == 0
+        self._count += 1
+        return update
+
+
+class RunningAverage(_GrayModel):
+    """
+    Nền = trung bình trượt (accumulateWeighted) của ảnh xám, tiền cảnh = |frame - nền|.
+    alpha là tỉ lệ cập nhật mỗi lần cập nhật (mỗi update_every frame).
+    """
+
+    def __init__(self, alpha=None, update_every=1, blur=5):
+        super().__init__(update_every, blur)
+        self.alpha = 0.02 if alpha is None else alpha
+        self._background = None    # float32 để tích lũy không bị làm tròn
+        self._background8 = None   # bản uint8 dùng cho absdiff
+
+    def apply(self, frame, fgmask=None):
+        gray = self._gray = self._to_gray(frame, self._gray)
+        if self._background is None or self._background.shape != gray.shape:
+            self._background = gray.astype(np.float32)
+            self._background8 = gray.copy()
+            self._count = 1
+        mask = cv2.absdiff(gray, self._background8, dst=fgmask)
+        if self._should_update():
+            cv2.accumulateWeighted(gray, self._background, self.alpha)
+            cv2.convertScaleAbs(self._background, dst=self._background8)
+        return mask
+
+
+class FrameDifference(_GrayModel):
+    """
+    Tiền cảnh = |frame - frame tham chiếu|, frame tham chiếu được thay mỗi update_every
+    frame. Rẻ nhất nhưng chỉ thấy phần đang chuyển động: vật đứng yên biến mất và
+    vật màu đồng nhất chỉ hiện phần mép (cần morphology đóng lỗ mạnh hơn).
+    """
+
+    def __init__(self, update_every=1, blur=5):
+        super().__init__(update_every, blur)
+        self._previous = None
+
+    def apply(self, frame, fgmask=None):
+        gray = self._gray = self._to_gray(frame, self._gray)
+        if self._previous is None or self._previous.shape != gray.shape:
+            self._previous = gray.copy()
+            self._count = 1
+        mask = cv2.absdiff(gray, self._previous, dst=fgmask)
+        if self._should_update():
+            # đổi vai hai buffer thay vì copy
+            self._previous, self._gray = self._gray, self._previous
+        return mask
+
+
+def create_motion_model(backend=MOTION_BACKEND, update_every=MOTION_UPDATE_EVERY,
+                        learning_rate=MOTION_LEARNING_RATE):
+    if backend == "mog2":
+        return OpenCVSubtractor(create_subtractor(), learning_rate, update_every)
+    if backend == "knn":
+        knn = cv2.createBackgroundSubtractorKNN(history=500, dist2Threshold=400,
+                                                detectShadows=True)
+        # KNN với learningRate=0 làm hỏng bộ đếm cập nhật mẫu bên trong (mask sai),
+        # nên các frame "không cập nhật" dùng learning rate rất nhỏ thay cho 0
+        return OpenCVSubtractor(knn, learning_rate, update_every, frozen_rate=1e-6)
+    if backend == "running_avg":
+        return RunningAverage(learning_rate, update_every)
+    if backend == "frame_diff":
+        return FrameDifference(update_every)
+    raise ValueError(f"Motion backend không hỗ trợ: {backend}")
@@ -0,0 +1,4 @@
+# Ngưỡng mặc định cho mask của từng loại mô hình nền (pixel > ngưỡng là tiền cảnh)
+
+SHADOW_THRESHOLD = 135   # MOG2/KNN: bóng = 127, tiền cảnh = 255
+DIFF_THRESHOLD = 25      # hiệu ảnh xám |frame - nền| (running_avg, frame_diff)
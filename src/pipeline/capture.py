@@ -0,0 +1,142 @@
+import queue
+import threading
+
+import cv2
+
+
+def open_source(source):
+    """Mở video từ đường dẫn file hoặc chỉ số camera ("0", "1", ...)"""
+    if isinstance(source, str) and source.isdigit():
+        source = int(source)
+    return cv2.VideoCapture(source)
+
+
+def read_with_stride(cap, stride):
+    """Bỏ qua stride-1 frame bằng grab() (không giải mã) rồi đọc frame tiếp theo"""
+    for _ in range(stride - 1):
+        if not cap.grab():
+            return False, None
+    return cap.read()
+
+
+class FramePrefetcher:
+    """
+    Đọc + giải mã frame trên một thread nền, đẩy vào hàng đợi có giới hạn
+    để việc decode chạy song song với pipeline xử lý.
+
+    - stride: chỉ giải mã 1 frame trong mỗi `stride` frame, các frame bị bỏ
+      qua chỉ gọi grab() (không retrieve) nên gần như không tốn chi phí decode.
+    - drop_oldest: khi hàng đợi đầy thì bỏ frame cũ nhất thay vì chờ
+      (dùng cho camera trực tiếp để độ trễ không tích tụ).
+    - loop: hết video thì quay lại từ đầu (giống hành vi của UI).
+    """
+
+    def __init__(self, source, queue_size=8, stride=1, drop_oldest=False, loop=False):
+        self.cap = source if isinstance(source, cv2.VideoCapture) else open_source(source)
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.stride = max(1, int(stride))
+        self.drop_oldest = drop_oldest
+        self.loop = loop
+
+        self.frame_index = 0      # vị trí đọc hiện tại trong video (thread nền)
+        self.last_index = -1      # chỉ số của frame vừa trả về bởi read()
+        self.dropped = 0          # số frame bị bỏ do hàng đợi đầy
+        self._finished = False
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def finished(self):
+        return self._finished
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._finished = False
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.is_set():
+            # Bỏ qua frame bằng grab() - không giải mã ảnh
+            ok = True
+            for _ in range(self.stride - 1):
+                if not self.cap.grab():
+                    ok = False
+                    break
+                self.frame_index += 1
+
+            if ok:
+                ok, frame = self.cap.read()
+
+            if not ok:
+                if self.loop and self.frame_index > 0:
+                    self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                    self.frame_index = 0
+                    continue
+                self._put(None)   # báo hết video
+                return
+
+            self._put((self.frame_index, frame))
+            self.frame_index += 1
+
+    def _put(self, item):
+        if self.drop_oldest:
+            while True:
+                try:
+                    self.queue.put_nowait(item)
+                    return
+                except queue.Full:
+                    try:
+                        self.queue.get_nowait()
+                        self.dropped += 1
+                    except queue.Empty:
+                        pass
+        else:
+            while not self._stop.is_set():
+                try:
+                    self.queue.put(item, timeout=0.1)
+                    return
+                except queue.Full:
+                    continue
+
+    def read(self, timeout=None):
+        """Giống cv2.VideoCapture.read(): trả về (ret, frame)"""
+        if self._thread is None:
+            self.start()
+        if self._finished:
+            return False, None
+
+        try:
+            item = self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return False, None
+
+        if item is None:
+            self._finished = True
+            return False, None
+
+        self.last_index, frame = item
+        return True, frame
+
+    def stop(self):
+        """Dừng thread nền nhưng giữ nguyên capture (có thể start() lại)"""
+        self._stop.set()
+        if self._thread is not None:
+            # giải phóng chỗ trong hàng đợi để thread không bị kẹt ở put()
+            while self._thread.is_alive():
+                try:
+                    self.queue.get_nowait()
+                except queue.Empty:
+                    pass
+                self._thread.join(timeout=0.05)
+            self._thread = None
+        self.queue = queue.Queue(maxsize=self.queue.maxsize)
+
+    def release(self):
+        self.stop()
+        self.cap.release()
@@ -0,0 +1,192 @@
+"""
+Cache detection theo frame trên đĩa: giải mã + subtractor + morphology + detect chỉ
+chạy một lần, sau đó tracking / đếm với đường đếm hoặc tracker khác được chạy lại
+từ cache trong vài giây.
+
+Mỗi mục cache là một thư mục <cache_dir>/<khóa>/ gồm:
+    boxes.npy    (M, 4) int32  mọi box của mọi frame nối liền (x, y, w, h)
+    offsets.npy  (F + 1,) int64 box của frame i là boxes[offsets[i]:offsets[i + 1]]
+    frames.npy   (F,) int64    chỉ số frame nguồn (để tính dt khi có stride)
+    meta.json    cấu hình tạo ra cache + thống kê
+Các mảng được mở bằng mmap nên replay không cần đọc hết file vào bộ nhớ.
+
+Khóa = dấu vân tay video (kích thước + hash 1 MiB đầu/cuối, không đọc cả file)
++ mọi tham số ảnh hưởng tới detection (kích thước frame, ROI, scale, mô hình nền,
+ngưỡng, morphology, detector, stride). Đổi đường đếm / tracker / MAX_DISAPPEAR
+(khi không dùng ROI quanh đường đếm) vẫn dùng lại được cache.
+"""
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+
+from src.utils.logger import get_logger
+
+CACHE_VERSION = 1
+_SAMPLE = 1 << 20      # số byte đọc ở đầu và cuối file để tính dấu vân tay
+
+
+def video_fingerprint(path):
+    """Hash nhanh của file video: kích thước + 1 MiB đầu + 1 MiB cuối"""
+    size = os.path.getsize(path)
+    digest = hashlib.blake2b(str(size).encode(), digest_size=16)
+    with open(path, "rb") as f:
+        digest.update(f.read(_SAMPLE))
+        if size > _SAMPLE:
+            f.seek(max(_SAMPLE, size - _SAMPLE))
+            digest.update(f.read(_SAMPLE))
+    return digest.hexdigest()
+
+
+def _public_params(obj):
+    """Thuộc tính công khai kiểu đơn giản của một đối tượng (bỏ mảng, buffer...)"""
+    params = {"type": type(obj).__name__}
+    for name, value in vars(obj).items():
+        if name.startswith("_"):
+            continue
+        if isinstance(value, (bool, int, float, str, type(None))):
+            params[name] = value
+        elif isinstance(value, (tuple, list)):
+            params[name] = json.loads(json.dumps(value, default=str))
+    # subtractor của OpenCV: tham số nằm trong đối tượng C++
+    inner = getattr(obj, "subtractor", None)
+    if inner is not None:
+        for getter in ("getHistory", "getVarThreshold", "getDist2Threshold",
+                       "getDetectShadows", "getShadowValue"):
+            if hasattr(inner, getter):
+                params[getter[3:]] = getattr(inner, getter)()
+    return params
+
+
+def detection_config(pipeline, stride=1):
+    """Mọi tham số quyết định box đầu ra của PreprocessStage + detector"""
+    stage = pipeline.preprocess
+    roi = None
+    if stage.roi is not None:
+        roi = {"rect": [stage.roi.x, stage.roi.y, stage.roi.w, stage.roi.h],
+               "polygon": None if stage.roi.polygon is None else stage.roi.polygon.tolist()}
+    return {
+        "version": CACHE_VERSION,
+        "frame_size": list(stage.frame_size),
+        "roi": roi,
+        "scale": stage.scale,
+        "threshold": stage.threshold,
+        "motion": _public_params(stage.subtractor),
+        "morphology": [list(step) for step in stage.morphology.steps],
+        "kernel": stage.morphology.kernel.tolist(),
+        "detector": _public_params(pipeline.detector),
+        "stride": stride,
+    }
+
+
+def cache_key(path, config):
+    blob = json.dumps(config, sort_keys=True).encode()
+    return video_fingerprint(path) + "-" + hashlib.blake2b(blob, digest_size=8).hexdigest()
+
+
+class DetectionCache:
+    """Một mục cache đã ghi xong, các mảng mở bằng mmap (chỉ đọc)"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.boxes = np.load(os.path.join(directory, "boxes.npy"), mmap_mode="r")
+        self.offsets = np.load(os.path.join(directory, "offsets.npy"), mmap_mode="r")
+        self.frames = np.load(os.path.join(directory, "frames.npy"), mmap_mode="r")
+        with open(os.path.join(directory, "meta.json"), encoding="utf-8") as f:
+            self.meta = json.load(f)
+
+    def __len__(self):
+        return len(self.frames)
+
+    def __iter__(self):
+        """(chỉ số frame nguồn, mảng box (N, 4)) theo thứ tự frame"""
+        offsets = np.asarray(self.offsets)
+        for i, frame_index in enumerate(self.frames.tolist()):
+            yield frame_index, self.boxes[offsets[i]:offsets[i + 1]]
+
+
+class DetectionCacheWriter:
+    """Ghi box từng frame vào bộ nhớ theo khối, khi close() mới ghi ra đĩa (atomic rename)"""
+
+    def __init__(self, directory, meta):
+        self.directory = directory
+        self.meta = meta
+        self.start = time.perf_counter()
+        self._boxes = []
+        self._counts = []
+        self._frames = []
+
+    def append(self, frame_index, boxes):
+        boxes = np.asarray(boxes, dtype=np.int32).reshape(-1, 4)
+        self._boxes.append(boxes)
+        self._counts.append(len(boxes))
+        self._frames.append(frame_index)
+
+    def close(self):
+        tmp = f"{self.directory}.tmp{os.getpid()}"
+        os.makedirs(tmp, exist_ok=True)
+        boxes = np.concatenate(self._boxes) if self._boxes else np.empty((0, 4), np.int32)
+        offsets = np.zeros(len(self._counts) + 1, np.int64)
+        np.cumsum(self._counts, out=offsets[1:])
+        np.save(os.path.join(tmp, "boxes.npy"), boxes)
+        np.save(os.path.join(tmp, "offsets.npy"), offsets)
+        np.save(os.path.join(tmp, "frames.npy"), np.asarray(self._frames, np.int64))
+        meta = dict(self.meta, frames=len(self._frames), boxes=int(len(boxes)),
+                    created=time.strftime("%Y-%m-%d %H:%M:%S"))
+        with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=2)
+        if os.path.isdir(self.directory):
+            shutil.rmtree(self.directory)
+        os.replace(tmp, self.directory)
+        get_logger("detection_cache").info(
+            "cached %d frames (%d boxes) in %.1fs → %s", meta["frames"], meta["boxes"],
+            time.perf_counter() - self.start, self.directory)
+        return DetectionCache(self.directory)
+
+
+def open_cache(cache_dir, source, pipeline, stride=1):
+    """
+    (DetectionCache, None) nếu đã có cache cho video + cấu hình này,
+    ngược lại (None, DetectionCacheWriter) để ghi trong lần chạy này.
+    Camera / stream (không phải file) không được cache: (None, None).
+    """
+    if not os.path.isfile(str(source)):
+        return None, None
+    config = detection_config(pipeline, stride)
+    directory = os.path.join(cache_dir, cache_key(source, config))
+    if os.path.isfile(os.path.join(directory, "meta.json")):
+        return DetectionCache(directory), None
+    os.makedirs(cache_dir, exist_ok=True)
+    return None, DetectionCacheWriter(directory, {"source": os.path.abspath(source),
+                                                  "config": config})
+
+
+def replay(cache, pipeline, max_frames=None):
+    """
+    Chạy lại tracking + đếm của pipeline trên box trong cache (không decode video).
+    pipeline chỉ cần đúng tracker / đường đếm; trả về dict giống run_headless.
+    Không ghi sự kiện vào store của pipeline (các lần đi qua này đã xảy ra trước đó).
+    """
+    pipeline.reset()
+    start = time.perf_counter()
+    frames = 0
+    last = -1
+    for frame_index, boxes in cache:
+        if max_frames is not None and frames >= max_frames:
+            break
+        pipeline.track_and_count(boxes, dt=max(1, frame_index - last), record=False)
+        last = frame_index
+        frames += 1
+    seconds = time.perf_counter() - start
+    return {
+        "source": cache.meta.get("source"),
+        "frames": frames,
+        "seconds": seconds,
+        "fps": frames / seconds if seconds > 0 else 0.0,
+        "total": pipeline.total,
+        "lines": pipeline.line_counter.results(),
+        "cached": True,
+    }
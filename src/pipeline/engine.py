@@ -0,0 +1,266 @@
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from src.preprocessing.roi import RegionOfInterest
+from src.preprocessing.stage import PreprocessStage
+from src.detection.detector_factory import create_detector
+from src.tracking.tracker_factory import create_tracker
+from src.counting.event_store import is_file_key, source_key
+from src.counting.line_counter import CountingLine, LineCounter
+from src.utils.drawer import draw_tracks, draw_roi, draw_polyline
+from src.utils.config import (FRAME_WIDTH, FRAME_HEIGHT, MAX_DISAPPEAR,
+                              ROI_MARGIN, ROI_POLYGON, PROCESS_SCALE, TRACKER_BACKEND,
+                              COUNT_LINES, DETECTOR_BACKEND, MOTION_BACKEND)
+from src.utils.logger import NullMetrics
+from src.pipeline.capture import FramePrefetcher, open_source, read_with_stride
+from src.pipeline.scheduler import create_scheduler
+from src.pipeline.detection_cache import open_cache, replay
+
+# Kết quả xử lý một frame
+# crossed: ID vừa được đếm (hướng "in"), crossings: (id, tên đường, tên hướng) mọi lần đi qua
+FrameResult = namedtuple("FrameResult", ["frame", "boxes", "objects", "new_count",
+                                         "crossed", "crossings"])
+
+
+def build_lines(lines, line_y, frame_width):
+    """Danh sách CountingLine từ cấu hình (dict hoặc list điểm); mặc định 1 đường ngang"""
+    if not lines:
+        return [CountingLine.horizontal(line_y, frame_width)]
+
+    result = []
+    for line in lines:
+        if isinstance(line, CountingLine):
+            result.append(line)
+        elif isinstance(line, dict):
+            result.append(CountingLine(line["points"], line.get("name"),
+                                       line.get("directions", ("in", "out"))))
+        else:
+            result.append(CountingLine(line))
+    return result
+
+
+class PeopleCounterPipeline:
+    """Toàn bộ chuỗi xử lý một frame, dùng chung cho main.py, UI và chế độ headless"""
+
+    def __init__(self, frame_size=(FRAME_WIDTH, FRAME_HEIGHT), line_y=None,
+                 max_disappear=MAX_DISAPPEAR, roi_margin=ROI_MARGIN,
+                 roi_polygon=ROI_POLYGON, scale=PROCESS_SCALE, tracker=TRACKER_BACKEND,
+                 lines=COUNT_LINES, metrics=None, detector=DETECTOR_BACKEND,
+                 motion=MOTION_BACKEND, events=None):
+        self.frame_size = frame_size
+        # Mặc định đường đếm nằm giữa frame (giống logic cũ)
+        self.line_y = line_y if line_y is not None else frame_size[1] // 2
+        self.max_disappear = max_disappear
+        self.tracker_backend = tracker
+        self.detector = create_detector(detector)
+        self.line_counter = LineCounter(build_lines(lines, self.line_y, frame_size[0]))
+
+        # Chỉ xử lý vùng quanh đường đếm (nếu cấu hình), ở độ phân giải `scale`
+        self.roi = None
+        if roi_polygon:
+            self.roi = RegionOfInterest.from_polygon(roi_polygon, frame_size)
+        elif roi_margin:
+            # dải quanh mọi đường đếm đã cấu hình (không chỉ line_y mặc định)
+            self.roi = RegionOfInterest.around_lines(self.line_counter.lines, roi_margin,
+                                                     frame_size)
+        self.metrics = metrics or NullMetrics()
+        # CountEventStore (hoặc None): ghi mọi lần đi qua đường (xem set_source / resume)
+        self.events = events
+        self.event_source = "live:default"
+        self.source_frame = -1     # chỉ số frame nguồn (cộng dồn dt), dùng cho sự kiện đếm
+        self._record_after = -1
+        self.preprocess = PreprocessStage(frame_size, roi=self.roi, scale=scale,
+                                          metrics=self.metrics, motion=motion)
+        self.reset()
+
+    @property
+    def scale(self):
+        return self.preprocess.scale
+
+    @scale.setter
+    def scale(self, value):
+        self.preprocess.scale = value
+
+    def reset(self):
+        """Khởi tạo lại subtractor, tracker và bộ đếm"""
+        self.preprocess.reset()
+        self.tracker = create_tracker(self.tracker_backend, self.max_disappear)
+        self.line_counter.reset()
+        self.total = 0
+        self.old_objects = {}
+        self.frame_index = 0
+        if self.events is not None:
+            self._record_after = self._recorded_until()
+
+    def set_source(self, source):
+        """Gắn nguồn vừa mở (từ frame 0) cho sự kiện đếm; gọi mỗi khi mở nguồn mới"""
+        self.source_frame = -1
+        if self.events is not None:
+            self.event_source = source_key(source)
+            self._record_after = self._recorded_until()
+
+    def _recorded_until(self):
+        # file video: frame đã có sự kiện trong store (lần chạy trước) không được ghi lại
+        if is_file_key(self.event_source):
+            return self.events.last_frame.get(self.event_source, -1)
+        return -1
+
+    def resume(self, source):
+        """
+        Gọi một lần sau khi tạo pipeline. Camera / stream tiếp tục tổng đếm đã lưu trong
+        store; file video bắt đầu từ 0 (chạy lại cùng file không cộng dồn số đếm).
+        """
+        self.set_source(source)
+        if self.events is not None and not is_file_key(self.event_source):
+            self.line_counter.restore(self.events.line_totals(self.event_source))
+            self.total = int(self.line_counter.totals[:, 0].sum())
+
+    def process(self, frame, draw=True, dt=1):
+        """
+        Xử lý một frame. draw=False bỏ qua toàn bộ bước vẽ (chế độ headless).
+        dt: số frame nguồn kể từ frame xử lý trước (stride), cho tracker dự đoán chuyển động.
+        result.frame là buffer dùng lại của PreprocessStage: copy nếu cần giữ qua frame sau.
+        """
+        m = self.metrics
+        m.start_frame()
+        frame, clean = self.preprocess.apply(frame)
+
+        # Diện tích tối thiểu tính theo tỉ lệ thu nhỏ, box đổi về tọa độ frame hiển thị
+        boxes = self.detector.detect(clean, self.scale, self.roi.offset if self.roi else (0, 0))
+        m.lap("detect")
+        objects, new_count, crossed, crossings = self.track_and_count(boxes, dt)
+
+        if draw:
+            self.draw(frame, objects)
+            m.lap("draw")
+
+        m.observe("boxes", len(boxes))
+        m.set_gauge("active_tracks", len(objects))
+        m.inc("crossings", new_count)
+        m.end_frame()
+
+        return FrameResult(frame, boxes, objects, new_count, crossed, crossings)
+
+    def track_and_count(self, boxes, dt=1, record=True):
+        """
+        Tracking + đếm từ box đã có (dùng chung cho process() và replay từ cache).
+        record=False: không ghi sự kiện vào store (replay không phải lần đi qua mới).
+        """
+        m = self.metrics
+        objects = self.tracker.update(boxes, dt)
+        m.lap("tracker")
+
+        # đếm trên mọi đường, cả hai hướng; total = tổng lượt "in"
+        frame_counts, hits = self.line_counter.update(objects, self.old_objects)
+        new_count = int(frame_counts[:, 0].sum())
+        self.total += new_count
+        lines = self.line_counter.lines
+        crossed = [obj_id for obj_id, _, direction in hits if direction == 0]
+        crossings = [(obj_id, lines[i].name, lines[i].directions[direction])
+                     for obj_id, i, direction in hits]
+        self.source_frame += dt
+        if (crossings and record and self.events is not None
+                and self.source_frame > self._record_after):
+            self.events.record(time.time(), self.event_source, self.source_frame,
+                               [(int(obj_id), line, direction)
+                                for obj_id, line, direction in crossings])
+        m.lap("counter")
+        # TrackSet là ảnh chụp bất biến: giữ lại trực tiếp, không cần copy
+        self.old_objects = objects
+        self.frame_index += 1
+        return objects, new_count, crossed, crossings
+
+    def draw(self, frame, tracks):
+        for line in self.line_counter.lines:
+            draw_polyline(frame, line.points.astype(np.int32))
+        if self.roi:
+            draw_roi(frame, self.roi.outline())
+
+        draw_tracks(frame, tracks)
+
+
+def run_headless(source, max_frames=None, pipeline=None, report_every=0,
+                 stride=1, prefetch=True, budget_ms=None, cache_dir=None):
+    """
+    Chạy pipeline không hiển thị, nhanh nhất có thể.
+    prefetch=True: decode trên thread nền (FramePrefetcher), stride > 1 bỏ frame bằng grab().
+    budget_ms: ngân sách thời gian mỗi frame, bật LoadShedder tự chỉnh stride / scale /
+    morphology (khi đó stride ban đầu do scheduler quyết định).
+    cache_dir: nếu đã có cache detection cho video + cấu hình tiền xử lý thì chỉ chạy lại
+    tracking + đếm từ cache; nếu chưa thì ghi cache khi chạy hết video
+    (không dùng cùng budget_ms vì scheduler đổi scale / morphology giữa chừng).
+    Trả về dict thống kê: frames, seconds, fps, total.
+    """
+    if pipeline is None:
+        pipeline = PeopleCounterPipeline()
+
+    writer = None
+    if cache_dir and not budget_ms:
+        cached, writer = open_cache(cache_dir, source, pipeline, stride)
+        if cached is not None:
+            return replay(cached, pipeline, max_frames)
+
+    pipeline.set_source(source)
+    if prefetch:
+        cap = FramePrefetcher(source, stride=stride)
+    else:
+        cap = open_source(source)
+    if not cap.isOpened():
+        raise IOError(f"Không thể mở nguồn video: {source}")
+
+    scheduler = create_scheduler(pipeline, budget_ms, capture=cap if prefetch else None)
+
+    m = pipeline.metrics
+    frames = 0
+    last_index = -1
+    finished = False
+    start = time.perf_counter()
+    try:
+        while max_frames is None or frames < max_frames:
+            t0 = time.perf_counter()
+            if not prefetch and scheduler:
+                stride = scheduler.stride
+            ret, frame = cap.read() if prefetch else read_with_stride(cap, stride)
+            if not ret:
+                finished = True
+                break
+            # với prefetch đây là thời gian chờ frame từ thread decode
+            m.record("decode", time.perf_counter() - t0)
+            if prefetch:
+                m.set_counter("frames_dropped", cap.dropped)
+
+            # số frame nguồn đã trôi qua (stride có thể đổi giữa chừng do scheduler)
+            index = cap.last_index if prefetch else last_index + stride
+            dt = max(1, index - last_index)
+            last_index = index
+
+            t0 = time.perf_counter()
+            result = pipeline.process(frame, draw=False, dt=dt)
+            if writer:
+                writer.append(index, result.boxes)
+            if scheduler:
+                scheduler.observe(time.perf_counter() - t0)
+            frames += 1
+
+            if report_every and frames % report_every == 0:
+                elapsed = time.perf_counter() - start
+                print(f"[{frames}] {frames / elapsed:.1f} fps, count = {pipeline.total}")
+    finally:
+        cap.release()
+        m.export()
+    # chỉ ghi cache khi đã xử lý hết video (cache dở dang sẽ sai cho lần chạy sau)
+    if writer and finished:
+        writer.close()
+
+    seconds = time.perf_counter() - start
+    return {
+        "source": str(source),
+        "frames": frames,
+        "seconds": seconds,
+        "fps": frames / seconds if seconds > 0 else 0.0,
+        "total": pipeline.total,
+        "lines": pipeline.line_counter.results(),
+        "quality_changes": len(scheduler.decisions) if scheduler else 0,
+    }
@@ -0,0 +1,148 @@
+import multiprocessing as mp
+import os
+import queue
+import time
+
+import cv2
+
+from src.pipeline.capture import FramePrefetcher
+from src.pipeline.engine import PeopleCounterPipeline
+from src.utils.config import METRICS_INTERVAL
+from src.utils.logger import create_metrics
+
+
+def is_camera(source):
+    return isinstance(source, int) or (isinstance(source, str) and source.isdigit())
+
+
+def _stream_worker(assigned, result_queue, stop_event, max_frames, report_every,
+                   pipeline_options, metrics_dir):
+    """
+    Một process xử lý luân phiên nhiều luồng video.
+    Mỗi luồng có mô hình nền + tracker riêng (PeopleCounterPipeline(**pipeline_options)),
+    metrics (nếu bật) ghi vào <metrics_dir>/stream-<id>.
+    """
+    # Mỗi process chỉ dùng 1 thread OpenCV để không tranh CPU với các process khác
+    cv2.setNumThreads(1)
+
+    streams = []
+    for stream_id, source in assigned:
+        cap = FramePrefetcher(source, drop_oldest=is_camera(source))
+        if not cap.isOpened():
+            result_queue.put(("done", stream_id, {"source": str(source), "frames": 0,
+                                                  "seconds": 0.0, "total": 0,
+                                                  "error": "cannot open source"}))
+            continue
+        metrics = create_metrics(metrics_dir is not None,
+                                 os.path.join(metrics_dir or ".", f"stream-{stream_id}"),
+                                 METRICS_INTERVAL)
+        pipeline = PeopleCounterPipeline(**pipeline_options, metrics=metrics)
+        streams.append({"id": stream_id, "source": source, "cap": cap.start(),
+                        "pipeline": pipeline, "frames": 0, "start": time.perf_counter()})
+
+    active = list(streams)
+    try:
+        while active and not stop_event.is_set():
+            for st in list(active):
+                ret, frame = st["cap"].read(timeout=0.5)
+                finished = not ret and st["cap"].finished
+                if ret:
+                    result = st["pipeline"].process(frame, draw=False)
+                    st["frames"] += 1
+                    if result.new_count or (report_every and st["frames"] % report_every == 0):
+                        result_queue.put(("progress", st["id"], st["frames"], st["pipeline"].total))
+
+                if finished or (max_frames is not None and st["frames"] >= max_frames):
+                    active.remove(st)
+    except KeyboardInterrupt:
+        # Ctrl+C gửi tới cả nhóm process: vẫn gửi kết quả cuối về process cha
+        pass
+
+    for st in streams:
+        st["cap"].release()
+        st["pipeline"].metrics.export()
+        seconds = time.perf_counter() - st["start"]
+        result_queue.put(("done", st["id"], {
+            "source": str(st["source"]),
+            "frames": st["frames"],
+            "seconds": seconds,
+            "fps": st["frames"] / seconds if seconds > 0 else 0.0,
+            "total": st["pipeline"].total,
+        }))
+
+
+def run_streams(sources, workers=None, max_frames=None, report_every=100, on_update=None,
+                pipeline_options=None, metrics_dir=None):
+    """
+    Chạy nhiều nguồn video (file hoặc chỉ số camera) trên một pool process.
+    Số process mặc định = số lõi CPU; mỗi process nhận các luồng theo kiểu round-robin
+    nên 8-16 camera vẫn chạy được trên máy ít lõi hơn.
+
+    pipeline_options: tham số của PeopleCounterPipeline (dict gửi sang process con,
+    nên chỉ chứa giá trị pickle được). metrics_dir: bật metrics, mỗi luồng một thư mục con.
+
+    on_update(stream_id, totals, global_total) được gọi mỗi khi một luồng báo số đếm mới.
+    Trả về dict: {"streams": [stats theo thứ tự sources], "total": tổng tất cả luồng}.
+    """
+    sources = list(sources)
+    if not sources:
+        return {"streams": [], "total": 0}
+
+    n_workers = max(1, min(len(sources), workers or os.cpu_count() or 1))
+    indexed = list(enumerate(sources))
+    groups = [indexed[i::n_workers] for i in range(n_workers)]
+
+    # spawn: tránh fork một process đang có thread của OpenCV
+    ctx = mp.get_context("spawn")
+    result_queue = ctx.Queue()
+    stop_event = ctx.Event()
+    procs = [ctx.Process(target=_stream_worker,
+                         args=(group, result_queue, stop_event, max_frames, report_every,
+                               pipeline_options or {}, metrics_dir),
+                         daemon=True)
+             for group in groups]
+    for p in procs:
+        p.start()
+
+    totals = [0] * len(sources)
+    stats = [None] * len(sources)
+    try:
+        while any(s is None for s in stats):
+            try:
+                msg = result_queue.get(timeout=1.0)
+            except queue.Empty:
+                if not any(p.is_alive() for p in procs):
+                    break
+                continue
+
+            kind, stream_id = msg[0], msg[1]
+            if kind == "progress":
+                totals[stream_id] = msg[3]
+            else:
+                stats[stream_id] = msg[2]
+                totals[stream_id] = msg[2]["total"]
+
+            if on_update:
+                on_update(stream_id, totals, sum(totals))
+    except KeyboardInterrupt:
+        # Dừng các worker, chờ chúng gửi kết quả cuối cùng
+        stop_event.set()
+        while any(s is None for s in stats) and any(p.is_alive() for p in procs):
+            try:
+                msg = result_queue.get(timeout=1.0)
+            except queue.Empty:
+                continue
+            if msg[0] == "done":
+                stats[msg[1]] = msg[2]
+                totals[msg[1]] = msg[2]["total"]
+    finally:
+        stop_event.set()
+        for p in procs:
+            p.join(timeout=5)
+
+    for i, source in enumerate(sources):
+        if stats[i] is None:
+            stats[i] = {"source": str(source), "frames": 0, "seconds": 0.0,
+                        "total": totals[i], "error": "worker exited"}
+
+    return {"streams": stats, "total": sum(totals)}
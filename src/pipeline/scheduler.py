@@ -0,0 +1,153 @@
+from collections import namedtuple
+
+from src.preprocessing.morphology import MorphologyChain
+from src.utils.config import LATENCY_BUDGET_MS
+from src.utils.logger import NullMetrics, get_logger
+
+# Một mức chất lượng: stride (giải mã 1 / stride frame), scale (nhân với scale gốc
+# của pipeline), morph_depth (số lần lặp tối đa mỗi bước morphology, None = đầy đủ)
+QualityLevel = namedtuple("QualityLevel", ["name", "stride", "scale", "morph_depth"])
+
+# Thứ tự giảm chất lượng: morphology trước (rẻ, không ảnh hưởng mô hình nền),
+# rồi độ phân giải (subtractor học lại nền khi kích thước đổi), cuối cùng bỏ frame.
+DEFAULT_LEVELS = (
+    QualityLevel("full", 1, 1.0, None),
+    QualityLevel("light-morph", 1, 1.0, 1),
+    QualityLevel("half-res", 1, 0.5, 1),
+    QualityLevel("half-res/2", 2, 0.5, 1),
+    QualityLevel("half-res/3", 3, 0.5, 1),
+    QualityLevel("half-res/4", 4, 0.5, 1),
+)
+
+
+def shallow_steps(steps, depth):
+    """Giới hạn số lần lặp của mỗi bước morphology (giữ nguyên thứ tự các bước)"""
+    if depth is None:
+        return tuple(steps)
+    return tuple((op, min(iterations, depth)) for op, iterations in steps)
+
+
+class LoadShedder:
+    """
+    Tự động giảm / khôi phục chất lượng xử lý để giữ thời gian mỗi frame trong ngân sách.
+
+    budget là thời gian (giây) cho mỗi frame nguồn; ở stride s pipeline có s * budget
+    cho mỗi frame được xử lý. Thời gian process() được làm mượt (EWMA):
+    - vượt ngân sách liên tục `patience` frame → giảm một mức;
+    - dưới `headroom` * ngân sách của mức tốt hơn liên tục `recover_after` frame → khôi phục.
+    Sau mỗi lần đổi mức có `cooldown` frame chờ số đo ổn định. Nếu vừa khôi phục đã
+    phải giảm lại ngay, thời gian chờ khôi phục được nhân đôi (tránh dao động).
+    Mỗi quyết định được ghi log và gauge "quality_level".
+    """
+
+    def __init__(self, pipeline, budget, levels=DEFAULT_LEVELS, alpha=0.1, patience=10,
+                 recover_after=60, headroom=0.7, cooldown=15, capture=None):
+        self.pipeline = pipeline
+        self.budget = budget
+        self.levels = levels
+        self.alpha = alpha
+        self.patience = patience
+        self.recover_after = recover_after
+        self.headroom = headroom
+        self.cooldown = cooldown
+        self.capture = capture          # đối tượng có thuộc tính .stride (FramePrefetcher)
+        self.logger = get_logger("scheduler")
+        self.metrics = getattr(pipeline, "metrics", None) or NullMetrics()
+
+        self.base_scale = pipeline.scale
+        base = pipeline.preprocess.morphology
+        self._chains = {None: base}     # morph_depth → MorphologyChain
+        self.base_steps = base.steps
+        self.base_kernel = base.kernel
+
+        self.decisions = []             # (frame, mức cũ, mức mới, ewma giây)
+        self.reset()
+
+    def reset(self):
+        """Về lại chất lượng đầy đủ và xóa số đo (giữ lịch sử decisions)"""
+        self.level = 0
+        self.ewma = None
+        self.frames = 0
+        self._over = 0
+        self._under = 0
+        self._hold = 0
+        self._recover_wait = self.recover_after
+        self._last_recover = None       # số frame lúc khôi phục gần nhất
+        self.apply()
+
+    @property
+    def stride(self):
+        return self.levels[self.level].stride
+
+    @property
+    def current(self):
+        return self.levels[self.level]
+
+    def observe(self, seconds):
+        """Gọi sau mỗi frame được xử lý với thời gian process() của frame đó"""
+        self.frames += 1
+        self.ewma = seconds if self.ewma is None else (
+            self.alpha * seconds + (1 - self.alpha) * self.ewma)
+        if self._hold:
+            self._hold -= 1
+            return self.level
+
+        allowed = self.stride * self.budget
+        if self.ewma > allowed and self.level < len(self.levels) - 1:
+            self._over += 1
+            self._under = 0
+            if self._over >= self.patience:
+                self._change(self.level + 1, "degrade", allowed)
+            return self.level
+
+        self._over = 0
+        better = self.levels[self.level - 1] if self.level > 0 else None
+        if better and self.ewma < self.headroom * better.stride * self.budget:
+            self._under += 1
+            if self._under >= self._recover_wait:
+                self._change(self.level - 1, "recover", allowed)
+        else:
+            self._under = 0
+        return self.level
+
+    def _change(self, level, action, allowed):
+        old = self.level
+        if action == "degrade" and self._last_recover is not None and \
+                self.frames - self._last_recover <= self._recover_wait:
+            # khôi phục quá sớm: lần sau chờ lâu hơn
+            self._recover_wait = min(self._recover_wait * 2, self.recover_after * 16)
+        if action == "recover":
+            self._last_recover = self.frames
+        self.level = level
+        self._over = self._under = 0
+        self._hold = self.cooldown
+        self.decisions.append((self.frames, old, level, self.ewma))
+        self.apply()
+
+        q = self.levels[level]
+        self.logger.info(
+            "%s %s → %s: %.1f ms/frame (allowed %.1f ms), stride=%d scale=%.2f morph_depth=%s",
+            action, self.levels[old].name, q.name, self.ewma * 1000, allowed * 1000,
+            q.stride, self.base_scale * q.scale, q.morph_depth)
+        self.metrics.set_gauge("quality_level", level)
+        self.metrics.inc(f"scheduler_{action}")
+
+    def apply(self):
+        """Áp dụng mức hiện tại lên pipeline (scale, morphology) và nguồn frame (stride)"""
+        q = self.current
+        self.pipeline.scale = self.base_scale * q.scale
+        chain = self._chains.get(q.morph_depth)
+        if chain is None:
+            chain = self._chains[q.morph_depth] = MorphologyChain(
+                shallow_steps(self.base_steps, q.morph_depth))
+            chain.kernel = self.base_kernel
+        self.pipeline.preprocess.morphology = chain
+        if self.capture is not None:
+            self.capture.stride = q.stride
+
+
+def create_scheduler(pipeline, budget_ms=LATENCY_BUDGET_MS, capture=None):
+    """LoadShedder với ngân sách budget_ms mili giây mỗi frame; None = tắt"""
+    if not budget_ms:
+        return None
+    return LoadShedder(pipeline, budget_ms / 1000.0, capture=capture)
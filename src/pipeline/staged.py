@@ -0,0 +1,268 @@
+"""
+Chia pipeline của một luồng video thành các stage chạy trên process riêng,
+để một camera độ phân giải cao dùng được nhiều lõi CPU:
+
+    [decode] resize + crop ROI + thu nhỏ ──ring frame──▶ [subtract] mô hình nền + threshold
+        ──ring mask──▶ [process chính] morphology + detect + tracking + đếm
+
+Ảnh giữa các stage nằm trong SharedMemory chia thành các slot cố định (ring buffer);
+mỗi stage đọc / ghi thẳng vào slot qua view NumPy (cv2 ghi bằng dst=), qua Queue chỉ
+truyền (chỉ số slot, chỉ số frame) nên không pickle mảng nào. Slot được trả lại hàng
+đợi free khi stage sau dùng xong: số slot giới hạn độ trễ và bộ nhớ, stage nhanh tự
+chờ stage chậm nhất.
+
+Tracking + đếm ở process chính nên kết quả nằm sẵn trong `pipeline` sau khi chạy.
+"""
+import multiprocessing as mp
+import queue
+import time
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+
+from src.motion.motion_mask import create_motion_model
+from src.pipeline.capture import open_source, read_with_stride
+from src.pipeline.engine import PeopleCounterPipeline
+from src.preprocessing.thresholding import apply_threshold
+
+DEFAULT_SLOTS = 4
+_POLL = 0.1        # giây, chu kỳ kiểm tra cờ dừng khi chờ slot
+
+
+class SharedRing:
+    """
+    `slots` ảnh cùng shape / dtype trong một SharedMemory.
+    free: các slot trống (stage trước lấy để ghi), full: (slot, frame) đã ghi xong.
+    Truyền cho process con qua tham số của Process (spawn): con gắn vào cùng vùng nhớ.
+    """
+
+    def __init__(self, ctx, slots, shape, dtype=np.uint8):
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.slots = slots
+        nbytes = int(np.prod(self.shape)) * self.dtype.itemsize
+        self.shm = shared_memory.SharedMemory(create=True, size=max(1, slots * nbytes))
+        self.free = ctx.Queue()
+        self.full = ctx.Queue()
+        for slot in range(slots):
+            self.free.put(slot)
+        self._attach()
+
+    def _attach(self):
+        nbytes = int(np.prod(self.shape)) * self.dtype.itemsize
+        self.views = [np.ndarray(self.shape, self.dtype, buffer=self.shm.buf, offset=i * nbytes)
+                      for i in range(self.slots)]
+
+    def __getstate__(self):
+        return {"name": self.shm.name, "shape": self.shape, "dtype": self.dtype.str,
+                "slots": self.slots, "free": self.free, "full": self.full}
+
+    def __setstate__(self, state):
+        self.shape = state["shape"]
+        self.dtype = np.dtype(state["dtype"])
+        self.slots = state["slots"]
+        self.free = state["free"]
+        self.full = state["full"]
+        self.shm = shared_memory.SharedMemory(name=state["name"])
+        self._attach()
+
+    @staticmethod
+    def _get(q, stop):
+        while not stop.is_set():
+            try:
+                return q.get(timeout=_POLL)
+            except queue.Empty:
+                continue
+        return None
+
+    def acquire(self, stop):
+        """Chỉ số một slot trống (chờ nếu ring đầy); None nếu đã có lệnh dừng"""
+        return self._get(self.free, stop)
+
+    def publish(self, slot, frame_index):
+        self.full.put((slot, frame_index))
+
+    def end(self):
+        """Báo cho stage sau là không còn frame nào"""
+        self.full.put(None)
+
+    def receive(self, stop):
+        """(slot, frame) tiếp theo; None khi hết video hoặc có lệnh dừng"""
+        return self._get(self.full, stop)
+
+    def release(self, slot):
+        self.free.put(slot)
+
+    def close(self):
+        # view phải được bỏ trước, SharedMemory không đóng được khi còn buffer trỏ vào
+        self.views = []
+        self.shm.close()
+
+    def unlink(self):
+        self.shm.unlink()
+
+
+def _decode_stage(source, stride, frame_size, roi, scale, out, stop, stats):
+    cv2.setNumThreads(1)
+    cap = open_source(source)
+    w, h = frame_size
+    display = np.empty((h, w, 3), np.uint8)
+    work_size = out.shape[1], out.shape[0]
+    direct = roi is None and scale == 1.0
+
+    frames = 0
+    busy = 0.0
+    index = -1
+    try:
+        while True:
+            t0 = time.perf_counter()
+            ret, frame = read_with_stride(cap, stride)
+            if not ret:
+                break
+            index += stride
+            t1 = time.perf_counter()
+            slot = out.acquire(stop)
+            if slot is None:
+                break
+            t2 = time.perf_counter()
+            view = out.views[slot]
+            if direct:
+                cv2.resize(frame, frame_size, dst=view)
+            else:
+                cv2.resize(frame, frame_size, dst=display)
+                work = roi.crop(display) if roi else display
+                if scale != 1.0:
+                    cv2.resize(work, work_size, dst=view, interpolation=cv2.INTER_AREA)
+                else:
+                    np.copyto(view, work)
+            out.publish(slot, index)
+            frames += 1
+            busy += (t1 - t0) + (time.perf_counter() - t2)
+    finally:
+        out.end()
+        cap.release()
+        out.close()
+        stats.put(("decode", frames, busy))
+
+
+def _subtract_stage(motion, threshold, roi, src, out, stop, stats):
+    cv2.setNumThreads(1)
+    model = create_motion_model(motion)
+    fg = np.empty(src.shape[:2], np.uint8)
+
+    frames = 0
+    busy = 0.0
+    try:
+        while True:
+            item = src.receive(stop)
+            if item is None:
+                break
+            slot, index = item
+            dst = out.acquire(stop)
+            if dst is None:
+                break
+            t0 = time.perf_counter()
+            model.apply(src.views[slot], fgmask=fg)
+            src.release(slot)
+            mask = apply_threshold(fg, threshold, dst=out.views[dst])
+            if roi:
+                roi.apply_mask(mask)
+            out.publish(dst, index)
+            frames += 1
+            busy += time.perf_counter() - t0
+    finally:
+        out.end()
+        src.close()
+        out.close()
+        stats.put(("subtract", frames, busy))
+
+
+def run_staged(source, max_frames=None, pipeline=None, stride=1, slots=DEFAULT_SLOTS,
+               report_every=0):
+    """
+    Như run_headless nhưng decode và mô hình nền chạy trên hai process riêng.
+    Trả về dict thống kê giống run_headless, thêm "stages": thời gian bận của từng stage
+    (stage có utilization cao nhất là nút thắt).
+    """
+    if pipeline is None:
+        pipeline = PeopleCounterPipeline()
+    pipeline.set_source(source)
+    stage = pipeline.preprocess
+    shape = stage.work_shape
+    offset = stage.roi.offset if stage.roi else (0, 0)
+
+    ctx = mp.get_context("spawn")
+    frames_ring = SharedRing(ctx, slots, shape + (3,))
+    masks_ring = SharedRing(ctx, slots, shape)
+    stop = ctx.Event()
+    stats = ctx.Queue()
+    workers = [
+        ctx.Process(target=_decode_stage, daemon=True,
+                    args=(source, max(1, int(stride)), stage.frame_size, stage.roi, stage.scale,
+                          frames_ring, stop, stats)),
+        ctx.Process(target=_subtract_stage, daemon=True,
+                    args=(stage.motion, stage.threshold, stage.roi, frames_ring, masks_ring,
+                          stop, stats)),
+    ]
+
+    m = pipeline.metrics
+    frames = 0
+    busy = 0.0
+    last_index = -1
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    try:
+        while max_frames is None or frames < max_frames:
+            item = masks_ring.receive(stop)
+            if item is None:
+                break
+            slot, index = item
+            t0 = time.perf_counter()
+            m.start_frame()
+            clean = stage.morphology.apply(masks_ring.views[slot])
+            # morphology ghi ra buffer riêng: slot trả lại ngay cho stage subtract
+            masks_ring.release(slot)
+            m.lap("morphology")
+            boxes = pipeline.detector.detect(clean, stage.scale, offset)
+            m.lap("detect")
+            pipeline.track_and_count(boxes, max(1, index - last_index))
+            m.end_frame()
+            last_index = index
+            frames += 1
+            busy += time.perf_counter() - t0
+
+            if report_every and frames % report_every == 0:
+                elapsed = time.perf_counter() - start
+                print(f"[{frames}] {frames / elapsed:.1f} fps, count = {pipeline.total}")
+    finally:
+        seconds = time.perf_counter() - start
+        stop.set()
+        stage_stats = {"process": (frames, busy)}
+        for _ in workers:
+            try:
+                name, n, t = stats.get(timeout=5)
+                stage_stats[name] = (n, t)
+            except queue.Empty:
+                break
+        for worker in workers:
+            worker.join(timeout=5)
+            if worker.is_alive():
+                worker.terminate()
+        for ring in (frames_ring, masks_ring):
+            ring.close()
+            ring.unlink()
+        m.export()
+
+    return {
+        "source": str(source),
+        "frames": frames,
+        "seconds": seconds,
+        "fps": frames / seconds if seconds > 0 else 0.0,
+        "total": pipeline.total,
+        "lines": pipeline.line_counter.results(),
+        "stages": {name: {"frames": n, "busy": t,
+                          "utilization": t / seconds if seconds > 0 else 0.0}
+                   for name, (n, t) in stage_stats.items()},
+    }
@@ -0,0 +1,193 @@
+"""
+Quét tham số (MOG2 varThreshold, ngưỡng threshold, số lần lặp morphology, MIN_AREA)
+trên một video có số đếm đúng biết trước.
+
+Mỗi frame chỉ được giải mã + resize một lần rồi đưa qua mọi cấu hình; các cấu hình có
+chung tiền tố dùng chung kết quả của bước đó (cây tiền tố):
+
+    frame → MOG2(varThreshold) → threshold → morphology(open, close, dilate)
+          → findContours + diện tích (một lần) → lọc theo min_area → tracker + đếm
+
+Cây được chia cho các process theo varThreshold (nhánh đắt nhất, có trạng thái):
+mỗi process giải mã video một lần cho mọi cấu hình trong nhánh của nó.
+
+Thông lượng của mỗi cấu hình là ước lượng khi chạy riêng: tổng thời gian các bước
+trên đường đi của nó trong cây (decode + resize + subtractor + ... + tracker).
+"""
+import itertools
+import multiprocessing as mp
+import os
+import time
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+from src.counting.line_counter import LineCounter
+from src.pipeline.engine import build_lines
+from src.preprocessing.morphology import MorphologyChain
+from src.preprocessing.thresholding import apply_threshold
+from src.tracking.tracker_factory import create_tracker
+from src.utils.config import FRAME_WIDTH, FRAME_HEIGHT, MAX_DISAPPEAR, TRACKER_BACKEND
+
+SweepConfig = namedtuple("SweepConfig", ["var_threshold", "threshold", "open", "close",
+                                         "dilate", "min_area"])
+
+DEFAULT_GRID = {
+    "var_threshold": (16, 30, 50),
+    "threshold": (135, 200),
+    "open": (1, 2),
+    "close": (1, 2),
+    "dilate": (1,),
+    "min_area": (1500, 2500, 3500),
+}
+
+# ngưỡng mask và số lần lặp morphology phải là số nguyên
+INTEGER_FIELDS = ("threshold", "open", "close", "dilate")
+
+
+def expand_grid(grid):
+    """dict tham số → list giá trị (thiếu thì lấy DEFAULT_GRID) → list SweepConfig"""
+    grid = dict(DEFAULT_GRID, **grid)
+    unknown = set(grid) - set(SweepConfig._fields)
+    if unknown:
+        raise ValueError(f"Tham số quét không hỗ trợ: {', '.join(sorted(unknown))}")
+    for name in INTEGER_FIELDS:
+        bad = [v for v in grid[name] if int(v) != v]
+        if bad:
+            raise ValueError(f"{name} cần giá trị nguyên: {', '.join(map(str, bad))}")
+    values = [tuple(int(v) for v in grid[name]) if name in INTEGER_FIELDS
+              else tuple(grid[name]) for name in SweepConfig._fields]
+    return [SweepConfig(*combo) for combo in itertools.product(*values)]
+
+
+def _contour_boxes(mask):
+    """(diện tích, box) của mọi contour ngoài: dùng chung cho mọi min_area"""
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    areas = np.array([cv2.contourArea(c) for c in contours])
+    rects = np.array([cv2.boundingRect(c) for c in contours], np.int64).reshape(-1, 4)
+    return areas, rects
+
+
+def _sweep_branch(task):
+    """Chạy mọi cấu hình có cùng varThreshold trong một process"""
+    path, var_threshold, configs, tracker, lines, max_frames = task
+    cv2.setNumThreads(1)
+
+    subtractor = cv2.createBackgroundSubtractorMOG2(history=500, varThreshold=var_threshold)
+    chains = {}
+    for c in configs:
+        steps = (("open", c.open), ("close", c.close), ("dilate", c.dilate))
+        chains.setdefault((c.threshold, steps), MorphologyChain(steps))
+    thresholds = sorted({c.threshold for c in configs})
+    # mỗi cấu hình chỉ cần tracker + bộ đếm riêng (frame / mask đã dùng chung ở trên)
+    trackers = {c: create_tracker(tracker, MAX_DISAPPEAR) for c in configs}
+    counters = {c: LineCounter(build_lines(lines, FRAME_HEIGHT // 2, FRAME_WIDTH))
+                for c in configs}
+    previous = {c: {} for c in configs}
+    by_node = {}
+    for c in configs:
+        steps = (("open", c.open), ("close", c.close), ("dilate", c.dilate))
+        by_node.setdefault((c.threshold, steps), []).append(c)
+
+    # thời gian (giây) của từng nút trong cây
+    times = {"decode": 0.0, "subtractor": 0.0}
+    size = (FRAME_WIDTH, FRAME_HEIGHT)
+    frame_buf = np.empty((FRAME_HEIGHT, FRAME_WIDTH, 3), np.uint8)
+    fg_buf = np.empty((FRAME_HEIGHT, FRAME_WIDTH), np.uint8)
+    th_buf = np.empty_like(fg_buf)
+
+    cap = cv2.VideoCapture(path)
+    frames = 0
+    clock = time.perf_counter
+    while max_frames is None or frames < max_frames:
+        t0 = clock()
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frame = cv2.resize(frame, size, dst=frame_buf)
+        t1 = clock()
+        fg = subtractor.apply(frame, fgmask=fg_buf)
+        t2 = clock()
+        times["decode"] += t1 - t0
+        times["subtractor"] += t2 - t1
+
+        for threshold in thresholds:
+            t0 = clock()
+            mask = apply_threshold(fg, threshold, dst=th_buf)
+            times[threshold] = times.get(threshold, 0.0) + clock() - t0
+
+            for node, chain in chains.items():
+                if node[0] != threshold:
+                    continue
+                t0 = clock()
+                areas, rects = _contour_boxes(chain.apply(mask))
+                times[node] = times.get(node, 0.0) + clock() - t0
+
+                for c in by_node[node]:
+                    t0 = clock()
+                    objects = trackers[c].update(rects[areas >= c.min_area])
+                    counters[c].update(objects, previous[c])
+                    previous[c] = objects
+                    times[c] = times.get(c, 0.0) + clock() - t0
+        frames += 1
+    cap.release()
+
+    results = []
+    shared = times["decode"] + times["subtractor"]
+    for c in configs:
+        steps = (("open", c.open), ("close", c.close), ("dilate", c.dilate))
+        seconds = shared + times.get(c.threshold, 0.0) + times.get((c.threshold, steps), 0.0) \
+            + times.get(c, 0.0)
+        totals = counters[c].totals
+        results.append({
+            "config": c._asdict(),
+            "in": int(totals[:, 0].sum()),
+            "out": int(totals[:, 1].sum()),
+            "frames": frames,
+            "fps": frames / seconds if seconds > 0 else 0.0,
+        })
+    return results
+
+
+def run_sweep(path, truth_in, truth_out=None, grid=None, tracker=TRACKER_BACKEND,
+              lines=None, workers=None, max_frames=None):
+    """
+    Quét mọi cấu hình trong grid; trả về list kết quả đã xếp hạng:
+    sai số tăng dần, cùng sai số thì FPS (ước lượng khi chạy riêng) giảm dần.
+    """
+    configs = expand_grid(grid or {})
+    branches = {}
+    for c in configs:
+        branches.setdefault(c.var_threshold, []).append(c)
+    tasks = [(path, vt, cs, tracker, lines, max_frames) for vt, cs in branches.items()]
+    workers = min(workers or os.cpu_count() or 1, len(tasks))
+
+    start = time.perf_counter()
+    if workers > 1:
+        with mp.get_context("spawn").Pool(workers) as pool:
+            parts = pool.map(_sweep_branch, tasks)
+    else:
+        parts = [_sweep_branch(task) for task in tasks]
+    results = [r for part in parts for r in part]
+
+    for r in results:
+        r["error"] = abs(r["in"] - truth_in)
+        if truth_out is not None:
+            r["error"] += abs(r["out"] - truth_out)
+    results.sort(key=lambda r: (r["error"], -r["fps"]))
+    return {"results": results, "configs": len(configs), "workers": workers,
+            "seconds": time.perf_counter() - start}
+
+
+def format_table(results, top=None):
+    rows = results[:top] if top else results
+    header = (f"{'rank':>4} {'varThr':>6} {'thresh':>6} {'open':>4} {'close':>5} "
+              f"{'dilate':>6} {'min_area':>8} {'in':>5} {'out':>5} {'error':>5} {'fps':>8}")
+    lines = [header]
+    for rank, r in enumerate(rows, 1):
+        c = r["config"]
+        lines.append(f"{rank:4d} {c['var_threshold']:6g} {c['threshold']:6d} {c['open']:4d} "
+                     f"{c['close']:5d} {c['dilate']:6d} {c['min_area']:8g} {r['in']:5d} "
+                     f"{r['out']:5d} {r['error']:5d} {r['fps']:8.1f}")
+    return "\n".join(lines)
@@ -1,18 +1,59 @@
+from functools import lru_cache
+
 import cv2
 import numpy as np
 
-# Kernel tròn tốt hơn kernel vuông (ít làm méo hình)
-kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (5, 5))
-# hoặc kernel chữ nhật nhỏ hơn cũng ổn: np.ones((3,3), np.uint8)
-
-def clean_mask(mask):
-    # 1. Opening: loại nhiễu + tách các vùng dính nhẹ
-    mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, kernel, iterations=2)
-    
-    # 2. Closing: vá lỗ thủng bên trong người (rất quan trọng!)
-    mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, kernel, iterations=2)
-    
-    # 3. Dilate nhẹ để nối các phần bị đứt (chỉ 1 lần là đủ)
-    mask = cv2.dilate(mask, kernel, iterations=1)
-    
-    return mask
\ No newline at end of file
+# Chuỗi morphology mặc định: (phép toán, số lần lặp)
+# 1. Opening: loại nhiễu + tách các vùng dính nhẹ
+# 2. Closing: vá lỗ thủng bên trong người (rất quan trọng!)
+# 3. Dilate nhẹ để nối các phần bị đứt (chỉ 1 lần là đủ)
+DEFAULT_STEPS = (("open", 2), ("close", 2), ("dilate", 1))
+
+_OPS = {
+    "open": cv2.MORPH_OPEN,
+    "close": cv2.MORPH_CLOSE,
+    "erode": cv2.MORPH_ERODE,
+    "dilate": cv2.MORPH_DILATE,
+}
+
+
+@lru_cache(maxsize=None)
+def get_kernel(size=5, shape=cv2.MORPH_ELLIPSE):
+    # Kernel tròn tốt hơn kernel vuông (ít làm méo hình)
+    # hoặc kernel chữ nhật nhỏ hơn cũng ổn: np.ones((3,3), np.uint8)
+    return cv2.getStructuringElement(shape, (size, size))
+
+
+class MorphologyChain:
+    """
+    Gộp chuỗi open/close/dilate thành một phép toán có cấu hình,
+    dùng kernel cache sẵn và 2 buffer luân phiên (không cấp phát mỗi frame).
+    Kết quả trả về là buffer nội bộ: bị ghi đè ở lần gọi apply() tiếp theo.
+    """
+
+    def __init__(self, steps=DEFAULT_STEPS, kernel_size=5, kernel_shape=cv2.MORPH_ELLIPSE):
+        for op, _ in steps:
+            if op not in _OPS:
+                raise ValueError(f"Phép morphology không hỗ trợ: {op}")
+        self.steps = tuple(steps)
+        self.kernel = get_kernel(kernel_size, kernel_shape)
+        self._buffers = None
+
+    def apply(self, mask):
+        if self._buffers is None or self._buffers[0].shape != mask.shape:
+            self._buffers = (np.empty_like(mask), np.empty_like(mask))
+
+        src = mask
+        for i, (op, iterations) in enumerate(self.steps):
+            dst = self._buffers[i % 2]
+            cv2.morphologyEx(src, _OPS[op], self.kernel, dst=dst, iterations=iterations)
+            src = dst
+        return src
+
+
+def clean_mask(mask, steps=DEFAULT_STEPS):
+    # Phiên bản không giữ trạng thái: mỗi lần gọi trả về mảng mới
+    kernel = get_kernel()
+    for op, iterations in steps:
+        mask = cv2.morphologyEx(mask, _OPS[op], kernel, iterations=iterations)
+    return mask
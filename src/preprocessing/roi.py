@@ -0,0 +1,66 @@
+import cv2
+import numpy as np
+
+
+class RegionOfInterest:
+    """
+    Vùng cần xử lý trong frame (tọa độ frame hiển thị).
+    Các bước nặng (MOG2, threshold, morphology, contour) chỉ chạy trên phần crop,
+    nếu là đa giác thì mask ngoài đa giác bị xóa về 0.
+    """
+
+    def __init__(self, rect, polygon=None):
+        self.x, self.y, self.w, self.h = rect
+        self.polygon = None
+        if polygon is not None:
+            # Đa giác theo tọa độ bên trong vùng crop
+            self.polygon = np.array(polygon, np.int32) - (self.x, self.y)
+        self._mask = None
+
+    @classmethod
+    def around_lines(cls, lines, margin, frame_size):
+        """Hình chữ nhật bao mọi đoạn của các đường đếm, nới thêm margin px mỗi phía"""
+        frame_w, frame_h = frame_size
+        pts = np.concatenate([line.points for line in lines])
+        x0, y0 = np.maximum(np.floor(pts.min(axis=0)) - margin, 0).astype(int)
+        x1, y1 = np.minimum(np.ceil(pts.max(axis=0)) + margin + 1, (frame_w, frame_h)).astype(int)
+        if x1 <= x0 or y1 <= y0:
+            raise ValueError("Đường đếm nằm ngoài frame, không tạo được ROI quanh đường đếm")
+        return cls((int(x0), int(y0), int(x1 - x0), int(y1 - y0)))
+
+    @classmethod
+    def from_polygon(cls, points, frame_size):
+        frame_w, frame_h = frame_size
+        pts = np.array(points, np.int32)
+        x0, y0 = np.maximum(pts.min(axis=0), 0)
+        x1, y1 = np.minimum(pts.max(axis=0) + 1, (frame_w, frame_h))
+        return cls((int(x0), int(y0), int(x1 - x0), int(y1 - y0)), polygon=points)
+
+    @property
+    def offset(self):
+        return self.x, self.y
+
+    def crop(self, frame):
+        return frame[self.y:self.y + self.h, self.x:self.x + self.w]
+
+    def apply_mask(self, mask):
+        """Xóa phần mask nằm ngoài đa giác (không làm gì nếu ROI là hình chữ nhật)"""
+        if self.polygon is None:
+            return mask
+
+        # mask đa giác được cache theo kích thước ảnh xử lý (có thể đã thu nhỏ)
+        mh, mw = mask.shape[:2]
+        if self._mask is None or self._mask.shape != (mh, mw):
+            self._mask = np.zeros((mh, mw), np.uint8)
+            pts = np.round(self.polygon * (mw / self.w, mh / self.h)).astype(np.int32)
+            cv2.fillPoly(self._mask, [pts], 255)
+
+        return cv2.bitwise_and(mask, self._mask, dst=mask)
+
+    def outline(self):
+        """Các điểm biên để vẽ lên frame hiển thị"""
+        if self.polygon is not None:
+            return self.polygon + (self.x, self.y)
+        return np.array([(self.x, self.y), (self.x + self.w - 1, self.y),
+                         (self.x + self.w - 1, self.y + self.h - 1),
+                         (self.x, self.y + self.h - 1)], np.int32)
@@ -0,0 +1,90 @@
+import cv2
+import numpy as np
+
+from src.motion.morphology import default_steps
+from src.motion.motion_mask import create_motion_model
+from src.preprocessing.thresholding import apply_threshold
+from src.preprocessing.morphology import MorphologyChain
+from src.utils.config import MOTION_BACKEND
+from src.utils.logger import NullMetrics
+
+
+class BufferPool:
+    """Các buffer cấp phát sẵn, dùng lại giữa các frame (theo tên)"""
+
+    def __init__(self):
+        self._buffers = {}
+
+    def get(self, name, shape, dtype=np.uint8):
+        buf = self._buffers.get(name)
+        if buf is None or buf.shape != shape or buf.dtype != dtype:
+            buf = np.empty(shape, dtype)
+            self._buffers[name] = buf
+        return buf
+
+    @property
+    def nbytes(self):
+        return sum(buf.nbytes for buf in self._buffers.values())
+
+
+class PreprocessStage:
+    """
+    resize → (crop ROI → thu nhỏ) → subtractor → threshold → morphology,
+    mọi bước ghi vào buffer có sẵn nên ở trạng thái ổn định gần như không cấp phát.
+
+    motion: tên backend mô hình nền (xem src/motion); threshold=None và morphology=None
+    dùng ngưỡng và chuỗi morphology mặc định của backend đó.
+
+    apply() trả về (frame hiển thị, mask sạch). Cả hai là buffer dùng lại:
+    bị ghi đè ở frame sau, cần copy nếu muốn giữ lâu hơn.
+    """
+
+    def __init__(self, frame_size, roi=None, scale=1.0, threshold=None, morphology=None,
+                 metrics=None, motion=MOTION_BACKEND):
+        self.frame_size = frame_size
+        self.roi = roi
+        self.scale = scale
+        self.motion = motion
+        self._threshold = threshold
+        self.morphology = morphology or MorphologyChain(default_steps(motion))
+        self.pool = BufferPool()
+        self.metrics = metrics or NullMetrics()
+        self.reset()
+
+    def reset(self):
+        self.subtractor = create_motion_model(self.motion)
+        self.threshold = (self._threshold if self._threshold is not None
+                          else self.subtractor.threshold)
+
+    @property
+    def work_shape(self):
+        """(h, w) của ảnh đưa vào mô hình nền: sau crop ROI và thu nhỏ"""
+        w, h = (self.roi.w, self.roi.h) if self.roi else self.frame_size
+        if self.scale != 1.0:
+            w, h = int(round(w * self.scale)), int(round(h * self.scale))
+        return h, w
+
+    def apply(self, frame):
+        m = self.metrics
+        w, h = self.frame_size
+        display = cv2.resize(frame, self.frame_size, dst=self.pool.get("frame", (h, w, 3)))
+
+        work = self.roi.crop(display) if self.roi else display
+        if self.scale != 1.0:
+            sw = int(round(work.shape[1] * self.scale))
+            sh = int(round(work.shape[0] * self.scale))
+            work = cv2.resize(work, (sw, sh), dst=self.pool.get("scaled", (sh, sw, 3)),
+                              interpolation=cv2.INTER_AREA)
+        m.lap("resize")
+
+        mask_shape = work.shape[:2]
+        fg_mask = self.subtractor.apply(work, fgmask=self.pool.get("fg", mask_shape))
+        m.lap("subtractor")
+        th = apply_threshold(fg_mask, self.threshold, dst=self.pool.get("th", mask_shape))
+        if self.roi:
+            self.roi.apply_mask(th)
+        m.lap("threshold")
+
+        clean = self.morphology.apply(th)
+        m.lap("morphology")
+        return display, clean
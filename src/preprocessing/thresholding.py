@@ -1,5 +1,6 @@
 import cv2
 
-def apply_threshold(mask):
-    _, th = cv2.threshold(mask, 135, 255, cv2.THRESH_BINARY)
+def apply_threshold(mask, thresh=135, dst=None):
+    # Giá trị 135 loại bỏ bóng (MOG2 đánh dấu bóng = 127)
+    _, th = cv2.threshold(mask, thresh, 255, cv2.THRESH_BINARY, dst=dst)
     return th
@@ -0,0 +1,419 @@
+"""
+Dịch vụ mạng asyncio quanh pipeline: nhiều người xem từ xa cùng lúc, chỉ dùng thư viện chuẩn.
+
+    GET /                  trang dashboard đơn giản
+    GET /stats             JSON thống kê mọi luồng (frames, fps, tổng, từng đường đếm...)
+    GET /events            WebSocket: sự kiện đếm {"type": "count", ...} và
+                           {"type": "stats", ...} mỗi giây
+    GET /preview/<id>      MJPEG (multipart/x-mixed-replace) của luồng <id>
+    GET /preview/<id>.jpg  ảnh JPEG mới nhất
+
+Mỗi luồng video chạy pipeline trên một thread riêng (vòng xử lý). Thread này không bao
+giờ chờ mạng: sự kiện được chuyển sang event loop bằng call_soon_threadsafe, frame xem
+trước được ghi vào TripleBuffer (ghi đè frame chưa ai lấy).
+
+Phía event loop:
+- frame xem trước được mã hóa JPEG một lần (tối đa PREVIEW_MAX_FPS, chỉ khi có người xem)
+  và cùng một chuỗi byte được gửi cho mọi người xem; client chậm chỉ bỏ lỡ frame
+  trung gian, luôn nhận frame mới nhất khi gửi xong frame trước.
+- mỗi sự kiện được mã hóa thành frame WebSocket một lần; mỗi client có hàng đợi giới hạn,
+  khi đầy thì bỏ sự kiện cũ nhất (số bị bỏ có trong /stats, tổng đúng luôn có trong
+  sự kiện "stats" tiếp theo).
+"""
+import asyncio
+import json
+import threading
+import time
+from urllib.parse import urlsplit
+
+import cv2
+
+from src.pipeline.capture import FramePrefetcher
+from src.pipeline.engine import PeopleCounterPipeline
+from src.pipeline.multi_stream import is_camera
+from src.service.websocket import (OP_CLOSE, OP_PING, OP_PONG, WebSocketError,
+                                   encode_frame, handshake_response, read_frame)
+from src.utils.config import (PREVIEW_JPEG_QUALITY, PREVIEW_MAX_FPS, SERVICE_HOST,
+                              SERVICE_PORT)
+from src.utils.logger import get_logger
+from src.utils.triple_buffer import TripleBuffer
+
+EVENT_QUEUE_SIZE = 256     # sự kiện chờ gửi tối đa cho mỗi client WebSocket
+STATS_INTERVAL = 1.0       # giây giữa hai sự kiện "stats"
+WRITE_TIMEOUT = 30.0       # client không nhận được gì trong chừng này giây thì bị ngắt
+_BOUNDARY = "frame"
+
+_PAGE = """<!doctype html>
+<html><head><meta charset="utf-8"><title>People Counter</title></head>
+<body style="font-family: sans-serif">
+<h1>People Counter</h1><div id="streams"></div><pre id="log"></pre>
+<script>
+const streams = document.getElementById("streams"), log = document.getElementById("log");
+const ws = new WebSocket(`ws://${location.host}/events`);
+ws.onmessage = (msg) => {
+  const e = JSON.parse(msg.data);
+  if (e.type === "stats") {
+    for (const s of e.streams) {
+      let el = document.getElementById(`s${s.id}`);
+      if (!el) {
+        el = document.createElement("div");
+        el.id = `s${s.id}`;
+        el.innerHTML = `<h3></h3><img src="/preview/${s.id}" width="480">`;
+        streams.appendChild(el);
+      }
+      el.querySelector("h3").textContent =
+        `${s.source}: ${s.total} (${s.fps.toFixed(1)} fps) ${JSON.stringify(s.lines)}`;
+    }
+  } else if (e.type === "count") {
+    log.textContent = `${new Date(e.time * 1000).toLocaleTimeString()} stream ${e.stream} ` +
+      `track ${e.track} ${e.line} ${e.direction} → ${e.total}\\n` + log.textContent.slice(0, 4000);
+  }
+};
+</script></body></html>
+"""
+
+
+class StreamWorker:
+    """
+    Vòng xử lý của một luồng video trên thread riêng.
+    realtime=True: file video được xử lý theo FPS gốc (giống camera); False: nhanh nhất có thể.
+    """
+
+    def __init__(self, stream_id, source, service, pipeline_factory=PeopleCounterPipeline,
+                 realtime=True, loop_video=False):
+        self.id = stream_id
+        self.source = source
+        self.service = service
+        self.pipeline = pipeline_factory()
+        self.pipeline.resume(source)
+        self.realtime = realtime and not is_camera(source)
+        self.loop_video = loop_video
+        self.preview = TripleBuffer()
+        self.frames = 0
+        self.fps = 0.0
+        self.running = False
+        self.error = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self.running = True
+        self._thread = threading.Thread(target=self._run, name=f"stream-{self.id}", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        cap = FramePrefetcher(self.source, drop_oldest=is_camera(self.source),
+                              loop=self.loop_video)
+        if not cap.isOpened():
+            self.error = "cannot open source"
+            self.running = False
+            return
+        source_fps = cap.cap.get(cv2.CAP_PROP_FPS) or 25.0
+        interval = 1.0 / source_fps if self.realtime else 0.0
+        pipeline = self.pipeline
+        last_index = -1
+        next_due = time.perf_counter()
+        window_start, window_frames = next_due, 0
+        try:
+            while not self._stop.is_set():
+                ret, frame = cap.read(timeout=0.5)
+                if not ret:
+                    if cap.finished:
+                        break
+                    continue
+                index = cap.last_index
+                preview = self.service.has_viewers(self.id)
+                result = pipeline.process(frame, draw=preview, dt=max(1, index - last_index))
+                last_index = index
+                if preview:
+                    self.preview.put(result.frame)
+                if result.crossings:
+                    now = time.time()
+                    self.service.emit([
+                        {"type": "count", "stream": self.id, "time": now, "frame": index,
+                         "track": int(obj_id), "line": line, "direction": direction,
+                         "total": pipeline.total}
+                        for obj_id, line, direction in result.crossings])
+
+                self.frames += 1
+                window_frames += 1
+                now = time.perf_counter()
+                if now - window_start >= 1.0:
+                    self.fps = window_frames / (now - window_start)
+                    window_start, window_frames = now, 0
+                if interval:
+                    next_due = max(next_due + interval, now - interval)
+                    if next_due > now:
+                        self._stop.wait(next_due - now)
+        finally:
+            cap.release()
+            self.running = False
+
+    def stats(self):
+        return {"id": self.id, "source": str(self.source), "running": self.running,
+                "error": self.error, "frames": self.frames, "fps": self.fps,
+                "total": self.pipeline.total, "lines": self.pipeline.line_counter.results()}
+
+
+class PreviewChannel:
+    """JPEG mới nhất của một luồng: mã hóa một lần, dùng chung cho mọi người xem"""
+
+    def __init__(self, worker, max_fps=PREVIEW_MAX_FPS, quality=PREVIEW_JPEG_QUALITY):
+        self.worker = worker
+        self.interval = 1.0 / max_fps
+        self.params = [cv2.IMWRITE_JPEG_QUALITY, int(quality)]
+        self.viewers = 0
+        self.jpeg = None
+        self.seq = 0
+        self.encoded = 0
+        self._changed = asyncio.Condition()
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.interval)
+            if not self.viewers:
+                continue
+            frame, _ = self.worker.preview.take()
+            if frame is None:
+                continue
+            # frame "front" của TripleBuffer không bị ghi đè cho tới lần take() sau
+            ok, buf = await loop.run_in_executor(None, cv2.imencode, ".jpg", frame, self.params)
+            if not ok:
+                continue
+            self.jpeg = buf.tobytes()
+            self.seq += 1
+            self.encoded += 1
+            async with self._changed:
+                self._changed.notify_all()
+
+    async def next(self, seq):
+        """(seq, jpeg) của frame mới hơn seq (chờ nếu chưa có)"""
+        async with self._changed:
+            await self._changed.wait_for(lambda: self.seq != seq and self.jpeg is not None)
+        return self.seq, self.jpeg
+
+
+class EventClient:
+    def __init__(self, writer):
+        self.writer = writer
+        self.queue = asyncio.Queue(maxsize=EVENT_QUEUE_SIZE)
+        self.dropped = 0
+
+    def push(self, frame):
+        """Không chặn: hàng đợi đầy thì bỏ sự kiện cũ nhất"""
+        while True:
+            try:
+                self.queue.put_nowait(frame)
+                return
+            except asyncio.QueueFull:
+                self.queue.get_nowait()
+                self.dropped += 1
+
+
+class CounterService:
+    """
+    sources: danh sách file video / chỉ số camera, mỗi nguồn một StreamWorker.
+    pipeline_factory: tạo PeopleCounterPipeline cho mỗi luồng (tracker, đường đếm...).
+    """
+
+    def __init__(self, sources, host=SERVICE_HOST, port=SERVICE_PORT,
+                 preview_fps=PREVIEW_MAX_FPS, quality=PREVIEW_JPEG_QUALITY,
+                 pipeline_factory=PeopleCounterPipeline, realtime=True, loop_video=False):
+        self.host = host
+        self.port = port
+        self.workers = [StreamWorker(i, source, self, pipeline_factory, realtime, loop_video)
+                        for i, source in enumerate(sources)]
+        self.previews = [PreviewChannel(w, preview_fps, quality) for w in self.workers]
+        self.clients = set()
+        self.dropped = 0           # sự kiện bị bỏ của các client đã ngắt
+        self.log = get_logger("service")
+        self.loop = None
+        self.server = None
+        self._tasks = []
+        self._connections = set()
+
+    # ----- gọi từ thread xử lý (không chặn) -----
+
+    def has_viewers(self, stream_id):
+        return self.previews[stream_id].viewers > 0
+
+    def emit(self, events):
+        try:
+            self.loop.call_soon_threadsafe(self._broadcast, events)
+        except RuntimeError:       # event loop đã đóng (đang tắt dịch vụ)
+            pass
+
+    # ----- event loop -----
+
+    def _broadcast(self, events):
+        for event in events:
+            frame = encode_frame(json.dumps(event))
+            for client in self.clients:
+                client.push(frame)
+
+    def stats(self):
+        return {"type": "stats", "time": time.time(),
+                "streams": [dict(w.stats(), viewers=p.viewers, preview_encoded=p.encoded)
+                            for w, p in zip(self.workers, self.previews)],
+                "clients": len(self.clients),
+                "events_dropped": self.dropped + sum(c.dropped for c in self.clients)}
+
+    async def _stats_loop(self):
+        while True:
+            await asyncio.sleep(STATS_INTERVAL)
+            if self.clients:
+                self._broadcast([self.stats()])
+
+    async def start(self):
+        self.loop = asyncio.get_running_loop()
+        self.server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        for worker in self.workers:
+            worker.start()
+        self._tasks = [asyncio.create_task(p.run()) for p in self.previews]
+        self._tasks.append(asyncio.create_task(self._stats_loop()))
+        self.log.info("serving %d stream(s) on http://%s:%d/", len(self.workers),
+                      self.host, self.port)
+        return self
+
+    async def stop(self):
+        self.server.close()
+        tasks = self._tasks + list(self._connections)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        # join thread xử lý ngoài event loop
+        await self.loop.run_in_executor(None, lambda: [w.stop() for w in self.workers])
+        await self.server.wait_closed()
+
+    @property
+    def finished(self):
+        return all(not w.running for w in self.workers)
+
+    async def _handle(self, reader, writer):
+        task = asyncio.current_task()
+        self._connections.add(task)
+        try:
+            head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), WRITE_TIMEOUT)
+            lines = head.decode("latin-1").split("\r\n")
+            method, target, _ = lines[0].split(" ", 2)
+            headers = {}
+            for line in lines[1:]:
+                name, sep, value = line.partition(":")
+                if sep:
+                    headers[name.strip().lower()] = value.strip()
+            path = urlsplit(target).path
+
+            if method != "GET":
+                await self._respond(writer, 405, "text/plain", b"method not allowed")
+            elif path == "/":
+                await self._respond(writer, 200, "text/html; charset=utf-8", _PAGE.encode())
+            elif path == "/stats":
+                await self._respond(writer, 200, "application/json",
+                                    json.dumps(self.stats()).encode())
+            elif path == "/events" and headers.get("upgrade", "").lower() == "websocket":
+                await self._events(reader, writer, headers.get("sec-websocket-key", ""))
+            elif path.startswith("/preview/"):
+                await self._preview(writer, path[len("/preview/"):])
+            else:
+                await self._respond(writer, 404, "text/plain", b"not found")
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError,
+                ConnectionError, ValueError, WebSocketError):
+            pass
+        except asyncio.CancelledError:
+            # dịch vụ đang tắt: kết thúc bình thường (asyncio 3.11 báo lỗi nếu handler bị hủy)
+            pass
+        finally:
+            self._connections.discard(task)
+            writer.close()
+
+    async def _respond(self, writer, status, content_type, body):
+        reason = {200: "OK", 404: "Not Found", 405: "Method Not Allowed"}[status]
+        writer.write(f"HTTP/1.1 {status} {reason}\r\nContent-Type: {content_type}\r\n"
+                     f"Content-Length: {len(body)}\r\nCache-Control: no-cache\r\n"
+                     f"Connection: close\r\n\r\n".encode() + body)
+        await asyncio.wait_for(writer.drain(), WRITE_TIMEOUT)
+
+    async def _preview(self, writer, name):
+        snapshot = name.endswith(".jpg")
+        try:
+            channel = self.previews[int(name[:-4] if snapshot else name)]
+        except (ValueError, IndexError):
+            await self._respond(writer, 404, "text/plain", b"unknown stream")
+            return
+
+        channel.viewers += 1
+        try:
+            if snapshot:
+                _, jpeg = await asyncio.wait_for(channel.next(-1), WRITE_TIMEOUT)
+                await self._respond(writer, 200, "image/jpeg", jpeg)
+                return
+            writer.write(("HTTP/1.1 200 OK\r\nCache-Control: no-cache\r\nConnection: close\r\n"
+                          f"Content-Type: multipart/x-mixed-replace; boundary={_BOUNDARY}"
+                          "\r\n\r\n").encode())
+            seq = 0
+            while True:
+                seq, jpeg = await channel.next(seq)
+                writer.write(f"--{_BOUNDARY}\r\nContent-Type: image/jpeg\r\n"
+                             f"Content-Length: {len(jpeg)}\r\n\r\n".encode())
+                writer.write(jpeg)
+                writer.write(b"\r\n")
+                # chỉ người xem này chờ; các frame trong lúc chờ bị bỏ qua
+                await asyncio.wait_for(writer.drain(), WRITE_TIMEOUT)
+        finally:
+            channel.viewers -= 1
+
+    async def _events(self, reader, writer, key):
+        if not key:
+            raise WebSocketError("thiếu Sec-WebSocket-Key")
+        writer.write(handshake_response(key))
+        client = EventClient(writer)
+        client.push(encode_frame(json.dumps(self.stats())))
+        self.clients.add(client)
+        receiver = asyncio.create_task(self._receive(reader, client))
+        try:
+            while not receiver.done():
+                try:
+                    frame = await asyncio.wait_for(client.queue.get(), STATS_INTERVAL)
+                except asyncio.TimeoutError:
+                    continue
+                writer.write(frame)
+                await asyncio.wait_for(writer.drain(), WRITE_TIMEOUT)
+        finally:
+            receiver.cancel()
+            self.clients.discard(client)
+            self.dropped += client.dropped
+
+    async def _receive(self, reader, client):
+        """Đọc frame từ client: trả lời ping, dừng khi client đóng"""
+        try:
+            while True:
+                opcode, payload = await read_frame(reader)
+                if opcode == OP_CLOSE:
+                    client.push(encode_frame(payload[:2], OP_CLOSE))
+                    return
+                if opcode == OP_PING:
+                    client.push(encode_frame(payload, OP_PONG))
+        except (asyncio.IncompleteReadError, ConnectionError, WebSocketError):
+            return
+
+
+def run_service(sources, host=SERVICE_HOST, port=SERVICE_PORT, **kwargs):
+    """Chạy dịch vụ tới khi Ctrl+C"""
+    async def serve():
+        service = await CounterService(sources, host, port, **kwargs).start()
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await service.stop()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
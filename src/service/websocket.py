@@ -0,0 +1,82 @@
+"""
+Phần tối thiểu của WebSocket (RFC 6455) cho dịch vụ: bắt tay, đóng gói frame phía
+server (không mask) và đọc frame (có hoặc không mask). Chỉ dùng thư viện chuẩn.
+"""
+import base64
+import hashlib
+import struct
+
+_GUID = b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+OP_TEXT = 0x1
+OP_BINARY = 0x2
+OP_CLOSE = 0x8
+OP_PING = 0x9
+OP_PONG = 0xA
+
+MAX_PAYLOAD = 1 << 16      # client chỉ gửi ping / close nên không cần frame lớn
+
+
+class WebSocketError(Exception):
+    pass
+
+
+def accept_key(key):
+    """Giá trị Sec-WebSocket-Accept cho Sec-WebSocket-Key của client"""
+    digest = hashlib.sha1(key.strip().encode("ascii") + _GUID).digest()
+    return base64.b64encode(digest).decode("ascii")
+
+
+def handshake_response(key):
+    return ("HTTP/1.1 101 Switching Protocols\r\n"
+            "Upgrade: websocket\r\n"
+            "Connection: Upgrade\r\n"
+            f"Sec-WebSocket-Accept: {accept_key(key)}\r\n\r\n").encode("ascii")
+
+
+def encode_frame(payload, opcode=None, mask=None):
+    """
+    Một frame hoàn chỉnh (FIN=1). str → frame text, bytes → frame binary.
+    mask: 4 byte khi gửi từ phía client (server không mask).
+    """
+    if isinstance(payload, str):
+        payload = payload.encode("utf-8")
+        opcode = OP_TEXT if opcode is None else opcode
+    opcode = OP_BINARY if opcode is None else opcode
+
+    n = len(payload)
+    mask_bit = 0x80 if mask else 0
+    if n < 126:
+        header = struct.pack("!BB", 0x80 | opcode, mask_bit | n)
+    elif n < 1 << 16:
+        header = struct.pack("!BBH", 0x80 | opcode, mask_bit | 126, n)
+    else:
+        header = struct.pack("!BBQ", 0x80 | opcode, mask_bit | 127, n)
+    if mask:
+        return header + mask + _apply_mask(payload, mask)
+    return header + payload
+
+
+def _apply_mask(payload, mask):
+    data = bytearray(payload)
+    for i in range(len(data)):
+        data[i] ^= mask[i & 3]
+    return bytes(data)
+
+
+async def read_frame(reader, max_payload=MAX_PAYLOAD):
+    """(opcode, payload) của frame tiếp theo; IncompleteReadError khi kết nối đóng"""
+    b0, b1 = await reader.readexactly(2)
+    opcode = b0 & 0x0F
+    n = b1 & 0x7F
+    if n == 126:
+        n = struct.unpack("!H", await reader.readexactly(2))[0]
+    elif n == 127:
+        n = struct.unpack("!Q", await reader.readexactly(8))[0]
+    if n > max_payload:
+        raise WebSocketError(f"frame quá lớn: {n} byte")
+    mask = await reader.readexactly(4) if b1 & 0x80 else None
+    payload = await reader.readexactly(n)
+    if mask:
+        payload = _apply_mask(payload, mask)
+    return opcode, payload
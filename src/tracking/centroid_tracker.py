@@ -1,22 +1,48 @@
 from scipy.spatial import distance as dist
 
+from src.tracking.id_manager import IDManager
+from src.tracking.tracks import Track, TrackSet
+
 class CentroidTracker:
     def __init__(self, max_disappear=10):
-        self.nextID = 1
+        self.id_manager = IDManager()   # ID của track đã hủy được cấp lại
         self.objects = {}          # {id: (cx, cy)}
         self.disappear = {}        # {id: count}
+        self.boxes = {}            # {id: (x, y, w, h)} box gần nhất của track
+        self.age = {}              # {id: số frame từ khi đăng ký}
         self.max_disappear = max_disappear
 
-    def register(self, centroid):
-        self.objects[self.nextID] = centroid
-        self.disappear[self.nextID] = 0
-        self.nextID += 1
+    @property
+    def nextID(self):
+        return self.id_manager.next_id
+
+    def register(self, centroid, box=None):
+        obj_id = self.id_manager.allocate()[0]
+        self.objects[obj_id] = centroid
+        self.disappear[obj_id] = 0
+        self.boxes[obj_id] = box
+        self.age[obj_id] = 0
 
     def deregister(self, obj_id):
         del self.objects[obj_id]
         del self.disappear[obj_id]
+        del self.boxes[obj_id]
+        del self.age[obj_id]
+        self.id_manager.release((obj_id,))
+
+    def result(self, removed=()):
+        # trả về cấu trúc đầy đủ thay vì chỉ {id: centroid}
+        tracks = [Track(obj_id, self.boxes[obj_id], centroid, self.age[obj_id],
+                        self.disappear[obj_id])
+                  for obj_id, centroid in self.objects.items()]
+        return TrackSet(tracks, removed)
+
+    def update(self, boxes, dt=1):
+        # dt (số frame nguồn từ lần update trước) không dùng: không có mô hình chuyển động
+        self.id_manager.tick()
+        for obj_id in self.age:
+            self.age[obj_id] += 1
 
-    def update(self, boxes):
         # nếu không có ai trong frame
         if len(boxes) == 0:
             remove = []
@@ -26,9 +52,10 @@ class CentroidTracker:
                     remove.append(obj_id)
             for r in remove:
                 self.deregister(r)
-            return self.objects
+            return self.result(remove)
 
         # lấy centroid từ bounding box
+        boxes = [tuple(b) for b in boxes]
         input_centroids = []
         for x, y, w, h in boxes:
             cx = int(x + w/2)
@@ -37,9 +64,9 @@ class CentroidTracker:
 
         # nếu chưa có object → đăng ký hết
         if len(self.objects) == 0:
-            for ic in input_centroids:
-                self.register(ic)
-            return self.objects
+            for ic, box in zip(input_centroids, boxes):
+                self.register(ic, box)
+            return self.result()
 
         # so khớp centroid cũ – mới bằng khoảng cách Euclid
         obj_ids = list(self.objects.keys())
@@ -58,17 +85,18 @@ class CentroidTracker:
                 continue
             obj_id = obj_ids[r]
             self.objects[obj_id] = input_centroids[c]
+            self.boxes[obj_id] = boxes[c]
             self.disappear[obj_id] = 0
             used_cols.add(c)
 
         # đăng ký centroid mới
         for i, centroid in enumerate(input_centroids):
             if i not in used_cols:
-                self.register(centroid)
+                self.register(centroid, boxes[i])
 
-        return self.objects
+        return self.result()
  
     # def update_with_centroids(self, centroids):
     #     # Dùng lại logic cũ nhưng nhận trực tiếp list centroid thay vì boxes
     #     dummy_boxes = [(cx-1, cy-1, 2, 2) for cx, cy in centroids]  # fake box nhỏ
-    #     return self.update(dummy_boxes)    
\ No newline at end of file
+    #     return self.update(dummy_boxes)    
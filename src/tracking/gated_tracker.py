@@ -0,0 +1,227 @@
+import numpy as np
+
+from src.tracking.id_manager import IDManager
+from src.tracking.tracks import TrackSet
+from src.utils.config import MAX_DISAPPEAR, MAX_DISTANCE
+
+try:
+    from scipy.optimize import linear_sum_assignment
+except ImportError:          # không có scipy → dùng greedy có gate
+    linear_sum_assignment = None
+
+
+def box_centroids(boxes):
+    """Mảng (N, 4) box → mảng (N, 2) centroid nguyên (giống int(x + w/2))"""
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    return (boxes[:, :2] + boxes[:, 2:] / 2).astype(np.int64)
+
+
+def gated_pairs(tracks, detections, gates):
+    """
+    (hàng, cột, khoảng cách float32) của mọi cặp track i / detection j cách nhau
+    không quá gates[i].
+    Không tính ma trận khoảng cách đầy đủ: detection được sắp theo x, mỗi track chỉ
+    xét các detection trong dải [x - gate, x + gate] (tìm bằng searchsorted).
+    """
+    order = np.argsort(detections[:, 0], kind="stable")
+    xs = detections[order, 0]
+    # nới dải 1 px để sai số float32 của khoảng cách không loại nhầm cặp sát gate
+    lo = np.searchsorted(xs, tracks[:, 0] - gates - 1, "left")
+    hi = np.searchsorted(xs, tracks[:, 0] + gates + 1, "right")
+    counts = hi - lo
+    rows = np.repeat(np.arange(len(tracks)), counts)
+    # chỉ số trong dải của từng track: lo[i], lo[i] + 1, ..., hi[i] - 1
+    starts = np.repeat(lo - (np.cumsum(counts) - counts), counts)
+    cols = order[np.arange(len(rows)) + starts]
+
+    a = tracks.astype(np.float32)
+    b = detections.astype(np.float32)
+    dx = a[:, 0][rows] - b[:, 0][cols]
+    dy = a[:, 1][rows] - b[:, 1][cols]
+    dx *= dx
+    dy *= dy
+    dx += dy
+    dist = np.sqrt(dx, out=dx)
+
+    keep = dist <= gates[rows]
+    return rows[keep], cols[keep], dist[keep]
+
+
+def greedy_assignment(rows, cols, cost, shape):
+    """
+    Ghép cặp theo chi phí tăng dần trong các cặp ứng viên (rows, cols, cost).
+    Không duyệt từng cặp: mỗi vòng nhận mọi cặp nhỏ nhất cả theo hàng lẫn theo cột
+    (trong các cặp còn lại), rồi bỏ hàng / cột đã ghép. Với thứ tự sắp xếp ổn định,
+    kết quả giống hệt ghép tuần tự từ cặp gần nhất, chỉ cần vài vòng NumPy.
+    """
+    if len(rows) == 0:
+        return rows, cols
+
+    # chi phí bằng nhau: cặp có (hàng, cột) nhỏ hơn trước
+    order = np.lexsort((cols, rows, cost))
+    rows = rows[order]
+    cols = cols[order]
+    used_rows = np.zeros(shape[0], bool)
+    used_cols = np.zeros(shape[1], bool)
+    out_rows, out_cols = [], []
+    while len(rows):
+        # cặp đầu tiên (chi phí nhỏ nhất) của mỗi hàng và của mỗi cột
+        rank = np.arange(len(rows))
+        first_row = np.full(shape[0], len(rows))
+        first_col = np.full(shape[1], len(rows))
+        np.minimum.at(first_row, rows, rank)
+        np.minimum.at(first_col, cols, rank)
+        best = (first_row[rows] == rank) & (first_col[cols] == rank)
+        r, c = rows[best], cols[best]
+        out_rows.append(r)
+        out_cols.append(c)
+        used_rows[r] = True
+        used_cols[c] = True
+        left = ~(used_rows[rows] | used_cols[cols])
+        rows = rows[left]
+        cols = cols[left]
+    return np.concatenate(out_rows), np.concatenate(out_cols)
+
+
+def hungarian_assignment(rows, cols, cost, shape):
+    """Ghép cặp tối ưu (tổng chi phí nhỏ nhất) trong các cặp ứng viên"""
+    if len(rows) == 0:
+        return rows, cols
+    candidate = np.zeros(shape, bool)
+    candidate[rows, cols] = True
+    # cặp ngoài gate: chi phí lớn hơn mọi tổ hợp cặp trong gate
+    dense = np.full(shape, float(cost.max()) * 1e3 + 1.0)
+    dense[rows, cols] = cost
+    r, c = linear_sum_assignment(dense)
+    valid = candidate[r, c]
+    return r[valid], c[valid]
+
+
+class GatedTracker:
+    """
+    Tracker theo centroid, trạng thái lưu trong mảng NumPy.
+    Khác CentroidTracker: có ngưỡng khoảng cách tối đa (max_distance) nên blob mới
+    ở xa không "cướp" ID của track cũ; ghép cặp greedy hoặc Hungarian.
+    update(boxes) trả về TrackSet như CentroidTracker (ảnh chụp các mảng trạng thái;
+    Track chỉ được dựng khi có người đọc, ví dụ lúc vẽ).
+
+    predict=True: mô hình vận tốc không đổi (bộ lọc alpha-beta, tức Kalman với hệ số
+    cố định). Mỗi track được ghép với detection ở vị trí dự đoán
+    centroid + vận tốc * số frame kể từ lần thấy cuối, nên vẫn giữ được ID khi bỏ
+    nhiều frame (update(boxes, dt=stride)) hoặc khi mất dấu vài frame.
+    Centroid trả về vẫn là vị trí đo được lần cuối (không đếm dựa trên dự đoán).
+    Track mới chưa có vận tốc: gate nới rộng theo max_speed * số frame đã trôi qua
+    để lần ghép thứ hai (lần ước lượng vận tốc đầu tiên) không bị mất khi stride lớn.
+    """
+
+    def __init__(self, max_disappear=MAX_DISAPPEAR, max_distance=MAX_DISTANCE,
+                 assignment="greedy", predict=False, beta=0.5, max_speed=None):
+        if assignment == "hungarian" and linear_sum_assignment is None:
+            assignment = "greedy"
+        self.assign = hungarian_assignment if assignment == "hungarian" else greedy_assignment
+        self.max_disappear = max_disappear
+        self.max_distance = max_distance
+        self.predict = predict
+        self.beta = beta            # tỉ lệ cập nhật vận tốc theo sai số mỗi lần đo
+        # tốc độ tối đa (px / frame nguồn) của track chưa biết vận tốc
+        self.max_speed = max_speed if max_speed is not None else max_distance / 4
+
+        self.id_manager = IDManager()   # ID của track đã hủy được cấp lại
+        self.ids = np.empty(0, np.int64)
+        self.centroids = np.empty((0, 2), np.int64)
+        self.boxes = np.empty((0, 4), np.int64)
+        self.ages = np.empty(0, np.int32)
+        self.disappear = np.empty(0, np.int32)
+        self.velocity = np.empty((0, 2), np.float32)   # px / frame nguồn
+        self.elapsed = np.empty(0, np.float32)         # số frame nguồn kể từ lần đo cuối
+        self.hits = np.empty(0, np.int32)              # số lần được ghép với detection
+        self.objects = TrackSet([])
+
+    @property
+    def nextID(self):
+        return self.id_manager.next_id
+
+    def predicted(self):
+        """Vị trí dự đoán của mọi track tại frame hiện tại"""
+        return self.centroids + self.velocity * self.elapsed[:, None]
+
+    def update(self, boxes, dt=1):
+        """dt: số frame nguồn kể từ lần update trước (= stride khi bỏ frame)"""
+        boxes = np.asarray(boxes, dtype=np.int64).reshape(-1, 4)
+        detections = box_centroids(boxes)
+        self.elapsed += dt
+        self.id_manager.tick()
+
+        matched_tracks = matched_dets = np.empty(0, np.intp)
+        if len(self.ids) and len(detections):
+            if self.predict:
+                # chi phí tính theo đơn vị gate riêng của từng track
+                gates = self._gates()
+                rows, cols, cost = gated_pairs(self.predicted(), detections, gates)
+                cost /= gates[rows]
+            else:
+                gates = np.full(len(self.ids), self.max_distance, np.float32)
+                rows, cols, cost = gated_pairs(self.centroids, detections, gates)
+            matched_tracks, matched_dets = self.assign(rows, cols, cost,
+                                                       (len(self.ids), len(detections)))
+
+        if self.predict and len(matched_tracks):
+            self._update_velocity(matched_tracks, detections[matched_dets])
+
+        # cập nhật track được ghép, tăng bộ đếm mất dấu cho các track còn lại
+        self.disappear += 1
+        self.ages += 1
+        self.elapsed[matched_tracks] = 0
+        self.hits[matched_tracks] += 1
+        self.centroids[matched_tracks] = detections[matched_dets]
+        self.boxes[matched_tracks] = boxes[matched_dets]
+        self.disappear[matched_tracks] = 0
+
+        removed = ()
+        keep = self.disappear <= self.max_disappear
+        if not keep.all():
+            removed = self.ids[~keep].tolist()
+            self.id_manager.release(removed)
+            self.ids = self.ids[keep]
+            self.centroids = self.centroids[keep]
+            self.boxes = self.boxes[keep]
+            self.ages = self.ages[keep]
+            self.disappear = self.disappear[keep]
+            self.velocity = self.velocity[keep]
+            self.elapsed = self.elapsed[keep]
+            self.hits = self.hits[keep]
+
+        # đăng ký detection chưa được ghép
+        new = np.ones(len(detections), bool)
+        new[matched_dets] = False
+        n_new = int(new.sum())
+        if n_new:
+            self.ids = np.concatenate([self.ids, self.id_manager.allocate(n_new)])
+            self.centroids = np.concatenate([self.centroids, detections[new]])
+            self.boxes = np.concatenate([self.boxes, boxes[new]])
+            self.ages = np.concatenate([self.ages, np.zeros(n_new, np.int32)])
+            self.disappear = np.concatenate([self.disappear, np.zeros(n_new, np.int32)])
+            self.velocity = np.concatenate([self.velocity, np.zeros((n_new, 2), np.float32)])
+            self.elapsed = np.concatenate([self.elapsed, np.zeros(n_new, np.float32)])
+            self.hits = np.concatenate([self.hits, np.ones(n_new, np.int32)])
+
+        # ảnh chụp bằng mảng; Track / dict chỉ được dựng khi có người đọc
+        self.objects = TrackSet.from_arrays(self.ids.copy(), self.boxes.copy(),
+                                            self.centroids.copy(), self.ages.copy(),
+                                            self.disappear.copy(), removed)
+        return self.objects
+
+    def _gates(self):
+        gates = np.full(len(self.ids), self.max_distance, np.float32)
+        fresh = self.hits == 1
+        np.maximum(gates, self.max_speed * self.elapsed, out=gates, where=fresh)
+        return gates
+
+    def _update_velocity(self, tracks, measured):
+        """Vận tốc mới từ vị trí đo được (trước khi ghi đè centroid)"""
+        observed = (measured - self.centroids[tracks]) / self.elapsed[tracks, None]
+        # lần đo thứ hai: chưa có vận tốc trước đó, lấy luôn vận tốc quan sát
+        gain = np.where(self.hits[tracks] == 1, 1.0, self.beta).astype(np.float32)
+        velocity = self.velocity[tracks]
+        velocity += gain[:, None] * (observed - velocity)
+        self.velocity[tracks] = velocity
@@ -0,0 +1,59 @@
+from collections import deque
+
+
+class IDManager:
+    """
+    Cấp và thu hồi ID track để bộ nhớ và giá trị ID không tăng mãi khi chạy 24/7.
+
+    ID được trả lại bằng release() khi track bị hủy; sau `quarantine` lần tick()
+    nó mới được cấp lại (cũ nhất trước). quarantine >= 1 đảm bảo ID vừa hủy ở frame t
+    không xuất hiện lại ở frame t, khi old_objects (frame t-1) vẫn còn chứa nó,
+    nên bộ đếm không thấy một "bước di chuyển" giả giữa hai track khác nhau.
+    ID lớn nhất từng cấp (high_water) ≈ số track đồng thời tối đa + số ID đang chờ.
+    """
+
+    __slots__ = ("quarantine", "next_id", "frame", "_retired", "in_use")
+
+    def __init__(self, quarantine=1, first_id=1):
+        self.quarantine = quarantine
+        self.next_id = first_id
+        self.frame = 0
+        self._retired = deque()       # (frame thu hồi, id), theo thứ tự thu hồi
+        self.in_use = 0
+
+    @property
+    def high_water(self):
+        return self.next_id - 1
+
+    @property
+    def retired(self):
+        return len(self._retired)
+
+    def tick(self):
+        """Gọi một lần mỗi lần tracker.update()"""
+        self.frame += 1
+
+    def allocate(self, n=1):
+        """Danh sách n ID: dùng lại ID đã hết thời gian chờ, thiếu thì cấp ID mới"""
+        ids = []
+        retired = self._retired
+        ready = self.frame - self.quarantine
+        while len(ids) < n and retired and retired[0][0] <= ready:
+            ids.append(retired.popleft()[1])
+        missing = n - len(ids)
+        if missing:
+            ids.extend(range(self.next_id, self.next_id + missing))
+            self.next_id += missing
+        self.in_use += n
+        return ids
+
+    def release(self, ids):
+        for obj_id in ids:
+            self._retired.append((self.frame, obj_id))
+        self.in_use -= len(ids)
+
+    def reset(self):
+        self.next_id = 1
+        self.frame = 0
+        self._retired.clear()
+        self.in_use = 0
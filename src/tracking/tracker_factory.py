@@ -0,0 +1,16 @@
+from src.tracking.centroid_tracker import CentroidTracker
+from src.tracking.gated_tracker import GatedTracker
+from src.utils.config import TRACKER_BACKEND, MAX_DISAPPEAR, MAX_DISTANCE
+
+TRACKER_BACKENDS = ("centroid", "greedy", "hungarian", "predictive")
+
+def create_tracker(backend=TRACKER_BACKEND, max_disappear=MAX_DISAPPEAR,
+                   max_distance=MAX_DISTANCE):
+    if backend == "centroid":
+        return CentroidTracker(max_disappear)
+    if backend in ("greedy", "hungarian"):
+        return GatedTracker(max_disappear, max_distance, assignment=backend)
+    if backend == "predictive":
+        # greedy + mô hình vận tốc không đổi (giữ ID khi bỏ nhiều frame)
+        return GatedTracker(max_disappear, max_distance, assignment="greedy", predict=True)
+    raise ValueError(f"Tracker không hỗ trợ: {backend}")
@@ -0,0 +1,97 @@
+from collections import namedtuple
+from collections.abc import Mapping
+
+import numpy as np
+
+# age: số frame kể từ khi đăng ký, missed: số frame liên tiếp không ghép được detection
+Track = namedtuple("Track", ["id", "box", "centroid", "age", "missed"])
+
+
+class TrackSet(Mapping):
+    """
+    Kết quả tracker.update(): danh sách Track của frame hiện tại.
+    Vẫn dùng được như dict {id: (cx, cy)} cũ (count_people, LineCounter...).
+    Là ảnh chụp bất biến nên có thể giữ lại làm old_objects mà không cần copy.
+
+    Tạo từ list Track (CentroidTracker) hoặc từ mảng NumPy bằng from_arrays()
+    (GatedTracker); dạng còn lại (list Track, dict id → centroid, mảng) chỉ được
+    dựng khi cần đến, nên frame không ai vẽ / tra cứu theo ID không tốn thêm gì.
+    """
+
+    def __init__(self, tracks, removed=()):
+        self._tracks = tracks
+        self.removed = removed          # ID bị hủy trong lần update này
+        self._arrays = None
+        self._centroids = None
+
+    @classmethod
+    def from_arrays(cls, ids, boxes, centroids, ages, missed, removed=()):
+        """Các mảng phải là bản sao riêng (tracker không được sửa chúng về sau)"""
+        objects = cls(None, removed)
+        objects._arrays = (ids, boxes, centroids, ages, missed)
+        return objects
+
+    @property
+    def tracks(self):
+        if self._tracks is None:
+            ids, boxes, centroids, ages, missed = self._arrays
+            self._tracks = list(map(Track._make, zip(ids.tolist(), map(tuple, boxes.tolist()),
+                                                     map(tuple, centroids.tolist()),
+                                                     ages.tolist(), missed.tolist())))
+        return self._tracks
+
+    def arrays(self):
+        """(ids (N,), centroid (N, 2)) theo cùng thứ tự với tracks"""
+        if self._arrays is None:
+            tracks = self._tracks
+            ids = np.array([t.id for t in tracks], np.int64)
+            centroids = np.array([t.centroid for t in tracks], np.int64).reshape(-1, 2)
+            return ids, centroids
+        return self._arrays[0], self._arrays[2]
+
+    def matched(self, old_objects):
+        """
+        (ids, vị trí cũ (T, 2), vị trí mới (T, 2)) của các ID có mặt ở cả frame này
+        và old_objects, theo thứ tự track của frame này.
+        """
+        if not isinstance(old_objects, TrackSet):
+            ids = [obj_id for obj_id in self if obj_id in old_objects]
+            prev = np.array([old_objects[i] for i in ids], np.int64).reshape(-1, 2)
+            curr = np.array([self[i] for i in ids], np.int64).reshape(-1, 2)
+            return ids, prev, curr
+
+        ids, curr = self.arrays()
+        old_ids, prev = old_objects.arrays()
+        if not len(ids) or not len(old_ids):
+            return [], prev[:0], curr[:0]
+        order = np.argsort(old_ids)
+        pos = order[np.minimum(np.searchsorted(old_ids, ids, sorter=order), len(order) - 1)]
+        found = old_ids[pos] == ids
+        return ids[found].tolist(), prev[pos[found]], curr[found]
+
+    def _index(self):
+        if self._centroids is None:
+            if self._arrays is not None:
+                ids, centroids = self.arrays()
+                self._centroids = dict(zip(ids.tolist(), map(tuple, centroids.tolist())))
+            else:
+                self._centroids = {t.id: t.centroid for t in self._tracks}
+        return self._centroids
+
+    def __getitem__(self, obj_id):
+        return self._index()[obj_id]
+
+    def __iter__(self):
+        return iter(self._index())
+
+    def __len__(self):
+        if self._arrays is not None:
+            return len(self._arrays[0])
+        return len(self._tracks)
+
+    def __contains__(self, obj_id):
+        return obj_id in self._index()
+
+    def visible(self):
+        """Các track được ghép với một box ở frame này (box là box hiện tại)"""
+        return [t for t in self.tracks if t.missed == 0]
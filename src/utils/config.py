@@ -3,3 +3,54 @@ VIDEO_PATH = r"C:\PeopleCounter\PeopleCounter\data\example_01.mp4"
 MIN_AREA = 2500          # diện tích nhỏ nhất để coi là người
 MAX_DISAPPEAR = 10       # số frame được phép mất dấu
 LINE_Y = 300             # tọa độ đường đếm người
+
+FRAME_WIDTH = 640        # kích thước frame sau khi resize
+FRAME_HEIGHT = 480
+
+# Vùng xử lý (ROI) quanh đường đếm: None = xử lý toàn bộ frame
+ROI_MARGIN = None        # số px phía trên/dưới đường đếm, ví dụ 120
+ROI_POLYGON = None       # hoặc danh sách điểm [(x, y), ...] theo tọa độ frame hiển thị
+PROCESS_SCALE = 1.0      # tỉ lệ thu nhỏ ảnh trước khi xử lý (0.5 = một nửa)
+
+# "centroid" (cũ), "greedy", "hungarian" hoặc "predictive" (GatedTracker; predictive dự đoán
+# vị trí theo vận tốc nên giữ được ID khi bỏ nhiều frame)
+TRACKER_BACKEND = "centroid"
+MAX_DISTANCE = 80        # khoảng cách tối đa (px) để ghép track với detection
+
+# Nhiều đường đếm (None = một đường ngang tại giữa frame)
+# ví dụ: [{"name": "door1", "points": [(100, 200), (400, 260)], "directions": ("in", "out")}]
+COUNT_LINES = None
+
+METRICS_ENABLED = False  # đo thời gian từng bước + xuất metrics.jsonl / metrics.prom
+METRICS_DIR = "."
+METRICS_INTERVAL = 10.0  # giây giữa hai lần xuất
+
+DETECTOR_BACKEND = "contours"  # "contours" (findContours) hoặc "components" (BlobFilter)
+BLOB_MAX_AREA = None     # diện tích lớn nhất (px), None = không giới hạn
+BLOB_ASPECT = None       # (min, max) tỉ lệ cao/rộng, ví dụ (0.8, 5.0)
+BLOB_MIN_FILL = None     # tỉ lệ lấp đầy box tối thiểu, ví dụ 0.3
+
+DISPLAY_MAX_FPS = 25     # tốc độ vẽ tối đa của giao diện (độc lập với tốc độ xử lý)
+
+# Mô hình nền: "mog2" (mặc định), "knn", "running_avg" hoặc "frame_diff" (nhẹ hơn cho máy yếu)
+MOTION_BACKEND = "mog2"
+MOTION_UPDATE_EVERY = 1  # chỉ cập nhật mô hình nền mỗi N frame
+MOTION_LEARNING_RATE = None  # None = mặc định của backend (MOG2/KNN tự chọn, running_avg 0.02)
+
+# Ngân sách thời gian xử lý mỗi frame (ms) cho LoadShedder: None = tắt.
+# Khi bật, pipeline tự giảm morphology / độ phân giải / bỏ frame để theo kịp nguồn
+LATENCY_BUDGET_MS = None
+
+# Thư mục cache detection theo frame (None = tắt). Đổi đường đếm / tracker rồi chạy lại
+# headless sẽ dùng cache thay vì decode + subtractor + morphology lại toàn bộ video
+DETECTION_CACHE_DIR = None
+
+# Dịch vụ mạng (main.py --serve): HTTP + WebSocket sự kiện đếm + xem trước MJPEG
+SERVICE_HOST = "127.0.0.1"
+SERVICE_PORT = 8080
+PREVIEW_MAX_FPS = 5      # mỗi frame xem trước chỉ mã hóa JPEG một lần cho mọi người xem
+PREVIEW_JPEG_QUALITY = 70
+
+# Thư mục lưu sự kiện đếm (None = tắt): mọi lần đi qua đường được ghi theo lô, có tổng
+# theo phút / giờ, và tổng đếm được khôi phục khi khởi động lại
+EVENT_STORE_DIR = None
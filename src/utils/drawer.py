@@ -8,3 +8,14 @@ def draw_box(frame, box, obj_id):
     cv2.rectangle(frame, (x, y), (x+w, y+h), (0, 255, 0), 2)
     cv2.putText(frame, f"ID {obj_id}", (x, y - 5), 
                 cv2.FONT_HERSHEY_SIMPLEX, 0.6, (50, 255, 50), 2)
+
+def draw_tracks(frame, tracks):
+    # chỉ vẽ các track có box ở frame hiện tại
+    for track in tracks.visible():
+        draw_box(frame, track.box, track.id)
+
+def draw_roi(frame, points):
+    cv2.polylines(frame, [points], True, (255, 128, 0), 1)
+
+def draw_polyline(frame, points):
+    cv2.polylines(frame, [points], False, (0, 255, 255), 2)
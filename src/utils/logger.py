@@ -0,0 +1,211 @@
+import json
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+
+_configured = False
+
+
+def get_logger(name="people_counter"):
+    global _configured
+    if not _configured:
+        logging.basicConfig(level=logging.INFO,
+                            format="%(asctime)s %(levelname)s [%(name)s] %(message)s")
+        _configured = True
+    return logging.getLogger(name)
+
+
+class RollingHistogram:
+    """Giữ `window` giá trị gần nhất trong mảng vòng; phân vị chỉ tính khi export"""
+
+    def __init__(self, window=1024):
+        self.values = np.zeros(window, np.float64)
+        self.index = 0
+        self.filled = 0
+        self.count = 0           # tổng số lần ghi (tích lũy, cho Prometheus)
+        self.sum = 0.0
+
+    def add(self, value):
+        self.values[self.index] = value
+        self.index = (self.index + 1) % len(self.values)
+        if self.filled < len(self.values):
+            self.filled += 1
+        self.count += 1
+        self.sum += value
+
+    def percentiles(self, qs=(50, 95, 99)):
+        if not self.filled:
+            return [0.0] * len(qs)
+        return np.percentile(self.values[:self.filled], qs).tolist()
+
+
+class Metrics:
+    """
+    Đo thời gian từng bước của pipeline và các bộ đếm, xuất định kỳ ra
+    file JSON lines và file Prometheus text format.
+
+    Mỗi frame: start_frame() → lap("tên bước") sau mỗi bước → end_frame().
+    Thời gian ngoài process() (decode, render) ghi bằng record(stage, seconds).
+    Ghi và export có thể đến từ nhiều thread (render trên thread Tk, export trên thread
+    xử lý) nên mọi thay đổi và snapshot đều đi qua một lock.
+    """
+
+    enabled = True
+
+    def __init__(self, jsonl_path=None, prom_path=None, interval=10.0, window=1024,
+                 prefix="people_counter"):
+        self.jsonl_path = jsonl_path
+        self.prom_path = prom_path
+        self.interval = interval
+        self.window = window
+        self.prefix = prefix
+
+        self.stages = {}         # tên bước → RollingHistogram (giây)
+        self.values = {}         # tên đại lượng → RollingHistogram (vd số box mỗi frame)
+        self.counters = {}
+        self.gauges = {}
+        self._lock = threading.Lock()
+        self._frame_start = self._last = time.perf_counter()
+        self._next_export = time.monotonic() + interval
+
+    def _hist(self, table, name):
+        hist = table.get(name)
+        if hist is None:
+            hist = table[name] = RollingHistogram(self.window)
+        return hist
+
+    def start_frame(self):
+        self._frame_start = self._last = time.perf_counter()
+
+    def lap(self, stage):
+        now = time.perf_counter()
+        with self._lock:
+            self._hist(self.stages, stage).add(now - self._last)
+        self._last = now
+
+    def record(self, stage, seconds):
+        with self._lock:
+            self._hist(self.stages, stage).add(seconds)
+
+    def observe(self, name, value):
+        with self._lock:
+            self._hist(self.values, name).add(value)
+
+    def inc(self, name, n=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def set_counter(self, name, value):
+        with self._lock:
+            self.counters[name] = value
+
+    def set_gauge(self, name, value):
+        with self._lock:
+            self.gauges[name] = value
+
+    def end_frame(self):
+        elapsed = time.perf_counter() - self._frame_start
+        with self._lock:
+            self._hist(self.stages, "frame").add(elapsed)
+            self.counters["frames"] = self.counters.get("frames", 0) + 1
+        if time.monotonic() >= self._next_export:
+            self.export()
+
+    def snapshot(self):
+        def summarize(table):
+            out = {}
+            for name, hist in table.items():
+                p50, p95, p99 = hist.percentiles()
+                out[name] = {"p50": p50, "p95": p95, "p99": p99,
+                             "count": hist.count, "sum": hist.sum}
+            return out
+
+        with self._lock:
+            return {"time": time.time(), "stages": summarize(self.stages),
+                    "values": summarize(self.values), "counters": dict(self.counters),
+                    "gauges": dict(self.gauges)}
+
+    def export(self):
+        self._next_export = time.monotonic() + self.interval
+        snap = self.snapshot()
+        if self.jsonl_path:
+            with open(self.jsonl_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(snap) + "\n")
+        if self.prom_path:
+            # ghi file tạm rồi đổi tên để bên đọc không thấy file dở dang
+            tmp = self.prom_path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(self.prometheus_text(snap))
+            os.replace(tmp, self.prom_path)
+        return snap
+
+    def prometheus_text(self, snap=None):
+        snap = snap or self.snapshot()
+        p = self.prefix
+        lines = []
+
+        def summary(metric, label, table, help_text):
+            if not table:
+                return
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} summary")
+            for name, s in table.items():
+                for q, key in (("0.5", "p50"), ("0.95", "p95"), ("0.99", "p99")):
+                    lines.append(f'{metric}{{{label}="{name}",quantile="{q}"}} {s[key]:.9g}')
+                lines.append(f'{metric}_sum{{{label}="{name}"}} {s["sum"]:.9g}')
+                lines.append(f'{metric}_count{{{label}="{name}"}} {s["count"]}')
+
+        summary(f"{p}_stage_seconds", "stage", snap["stages"], "Thời gian mỗi bước pipeline")
+        summary(f"{p}_value", "name", snap["values"], "Giá trị đo mỗi frame")
+        for name, value in snap["counters"].items():
+            lines.append(f"# TYPE {p}_{name}_total counter")
+            lines.append(f"{p}_{name}_total {value}")
+        for name, value in snap["gauges"].items():
+            lines.append(f"# TYPE {p}_{name} gauge")
+            lines.append(f"{p}_{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+class NullMetrics:
+    """Bản tắt của Metrics: mọi phương thức không làm gì (chi phí ~1 lời gọi hàm)"""
+
+    enabled = False
+
+    def start_frame(self):
+        pass
+
+    def lap(self, stage):
+        pass
+
+    def record(self, stage, seconds):
+        pass
+
+    def observe(self, name, value):
+        pass
+
+    def inc(self, name, n=1):
+        pass
+
+    def set_counter(self, name, value):
+        pass
+
+    def set_gauge(self, name, value):
+        pass
+
+    def end_frame(self):
+        pass
+
+    def export(self):
+        return None
+
+
+def create_metrics(enabled, directory=".", interval=10.0):
+    if not enabled:
+        return NullMetrics()
+    os.makedirs(directory, exist_ok=True)
+    return Metrics(jsonl_path=os.path.join(directory, "metrics.jsonl"),
+                   prom_path=os.path.join(directory, "metrics.prom"),
+                   interval=interval)
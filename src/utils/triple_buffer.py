@@ -0,0 +1,36 @@
+import threading
+
+import numpy as np
+
+
+class TripleBuffer:
+    """
+    Giữ frame mới nhất giữa thread xử lý (ghi) và thread hiển thị (đọc) mà không cấp phát:
+    bên ghi copy vào buffer "back" rồi đổi chỗ với "ready", bên đọc lấy "ready" làm "front".
+    Bên ghi không bao giờ phải chờ bên đọc, frame cũ chưa được hiển thị bị ghi đè.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._back = self._ready = self._front = None
+        self._ready_info = self._front_info = None
+        self._fresh = False
+
+    def put(self, frame, info=None):
+        if self._back is None or self._back.shape != frame.shape:
+            self._back = np.empty_like(frame)
+        np.copyto(self._back, frame)
+        with self._lock:
+            self._back, self._ready = self._ready, self._back
+            self._ready_info = info
+            self._fresh = True
+
+    def take(self):
+        """(frame, info) mới nhất nếu có frame mới kể từ lần take() trước, ngược lại (None, None)"""
+        with self._lock:
+            if not self._fresh:
+                return None, None
+            self._front, self._ready = self._ready, self._front
+            self._front_info = self._ready_info
+            self._fresh = False
+        return self._front, self._front_info
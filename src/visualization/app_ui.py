@@ -1,17 +1,18 @@
+import threading
+import time
 import cv2
 import tkinter as tk
 from tkinter import ttk, filedialog
-from PIL import Image, ImageTk
-
-# Import các module chức năng (Giữ nguyên)
-from src.preprocessing.bg_subtractor import create_subtractor
-from src.preprocessing.thresholding import apply_threshold
-from src.preprocessing.morphology import clean_mask
-from src.detection.contour_detector import detect_people
-from src.tracking.centroid_tracker import CentroidTracker
-from src.counting.people_counter import count_people
-from src.utils.drawer import draw_line, draw_box
-from src.utils.config import VIDEO_PATH
+
+# Import các module chức năng
+from src.counting.event_store import create_event_store
+from src.pipeline.engine import PeopleCounterPipeline
+from src.pipeline.capture import FramePrefetcher
+from src.pipeline.scheduler import LoadShedder
+from src.utils.config import (VIDEO_PATH, METRICS_ENABLED, METRICS_DIR, METRICS_INTERVAL,
+                              LATENCY_BUDGET_MS, EVENT_STORE_DIR)
+from src.utils.logger import create_metrics
+from src.visualization.display import DisplayRenderer
 
 class PeopleCounterUI:
     def __init__(self, root):
@@ -25,18 +26,25 @@ class PeopleCounterUI:
         # --- Khởi tạo biến (Giữ nguyên logic) ---
         self.video_path = VIDEO_PATH
         self.cap = cv2.VideoCapture(self.video_path)
-        self.subtractor = create_subtractor()
-        self.tracker = CentroidTracker()
-        self.counted_ids = set()
-        self.total = 0
-        self.old_objects = {}
+        self.metrics = create_metrics(METRICS_ENABLED, METRICS_DIR, METRICS_INTERVAL)
+        self.events = create_event_store(EVENT_STORE_DIR)
+        self.pipeline = PeopleCounterPipeline(metrics=self.metrics, events=self.events)
+        self.pipeline.resume(self.video_path)
+        self.prefetcher = None      # thread đọc/giải mã frame nền
+        self.worker = None          # thread chạy pipeline
+        self.scheduler = None       # LoadShedder khi bật chế độ Auto
+        self.pipeline_lock = threading.Lock()
+        self.is_live = False
         self.is_running = False
         self.skip_frames = 0
-        self.frame_count = 0
         
         # --- Xây dựng giao diện ---
         self.create_widgets()
 
+        # Hiển thị tách khỏi xử lý: chỉ vẽ frame mới nhất, tối đa DISPLAY_MAX_FPS
+        self.renderer = DisplayRenderer(self.video_label, on_tick=self.on_display_tick,
+                                        metrics=self.metrics)
+
     def setup_styles(self):
         """Thiết lập màu sắc, font chữ và theme"""
         style = ttk.Style()
@@ -156,6 +164,11 @@ class PeopleCounterUI:
         self.speed_label = ttk.Label(speed_frame, text="Normal (1.0x)", width=12)
         self.speed_label.pack(side=tk.LEFT)
 
+        # Auto: tự giảm chất lượng / bỏ frame khi máy không theo kịp nguồn video
+        self.auto_var = tk.BooleanVar(value=LATENCY_BUDGET_MS is not None)
+        ttk.Checkbutton(speed_frame, text="Auto", variable=self.auto_var,
+                        command=self.toggle_auto).pack(side=tk.LEFT, padx=5)
+
         # --- Cột Phải: Thống kê ---
         right_box = ttk.Frame(control_panel, style='Panel.TFrame')
         right_box.grid(row=0, column=2, sticky="e")
@@ -170,12 +183,13 @@ class PeopleCounterUI:
         """Khởi động luồng video từ webcam (chỉ số 0)."""
         
         # 1. Dừng luồng cũ nếu đang chạy
-        self.is_running = False
+        self.stop_video()
         if self.cap and self.cap.isOpened():
             self.cap.release()
             
         # 2. Khởi tạo webcam (chỉ số 0) và thiết lập độ phân giải mặc định 640x480
         self.video_path = "Webcam Live"
+        self.is_live = True
         self.cap = cv2.VideoCapture(1)
         
         # Thiết lập độ phân giải để đồng bộ với logic xử lý (640x480)
@@ -187,17 +201,13 @@ class PeopleCounterUI:
             print("Error: Could not open webcam.")
             return
 
-        # 3. Reset trạng thái đếm và CV
-        self.subtractor = create_subtractor()
-        self.tracker = CentroidTracker()
-        self.counted_ids = set()
-        self.total = 0
-        self.old_objects = {}
-        self.frame_count = 0
+        # 3. Reset trạng thái CV; camera tiếp tục tổng đếm đã lưu trong store (nếu có)
+        self.pipeline.reset()
+        self.pipeline.resume(1)
 
         # 4. Cập nhật UI và bắt đầu luồng
         self.video_label_text.config(text="Webcam Live", foreground=self.colors['accent'])
-        self.count_label.config(text="0")
+        self.count_label.config(text=f"{self.pipeline.total}")
         
         # Hiển thị frame đầu tiên (placeholder)
         ret, frame = self.cap.read()
@@ -206,11 +216,30 @@ class PeopleCounterUI:
         
         self.start_video() # Tự động bắt đầu đếm
 
+    def create_scheduler(self):
+        """Ngân sách mỗi frame: LATENCY_BUDGET_MS hoặc theo FPS của nguồn (mặc định 25)"""
+        fps = self.cap.get(cv2.CAP_PROP_FPS) if self.cap else 0
+        budget_ms = LATENCY_BUDGET_MS or 1000.0 / (fps if 1 <= fps <= 240 else 25)
+        return LoadShedder(self.pipeline, budget_ms / 1000.0, capture=self.prefetcher)
+
+    def toggle_auto(self):
+        with self.pipeline_lock:
+            if self.scheduler:
+                self.scheduler.reset()
+                self.scheduler = None
+                self.update_speed(self.speed_var.get())
+            elif self.auto_var.get() and self.is_running:
+                self.scheduler = self.create_scheduler()
+
     def update_speed(self, value):
         speed_levels = {0: "Normal", 1: "1.5x", 2: "2.0x", 3: "2.5x", 4: "3.0x", 5: "4.0x"}
         skip_levels = {0: 0, 1: 1, 2: 2, 3: 3, 4: 4, 5: 6}
         level = int(float(value))
         self.skip_frames = skip_levels[level]
+        if self.scheduler:
+            return  # chế độ Auto đang điều khiển stride
+        if self.prefetcher:
+            self.prefetcher.stride = self.skip_frames + 1
         self.speed_label.config(text=speed_levels[level])
 
     def browse_video(self):
@@ -219,17 +248,14 @@ class PeopleCounterUI:
             filetypes=[("Video files", "*.mp4 *.avi *.mov *.mkv"), ("All files", "*.*")]
         )
         if file_path:
-            self.is_running = False
+            self.stop_video()
             if self.cap:
                 self.cap.release()
             self.video_path = file_path
+            self.is_live = False
             self.cap = cv2.VideoCapture(self.video_path)
-            self.subtractor = create_subtractor()
-            self.tracker = CentroidTracker()
-            self.counted_ids = set()
-            self.total = 0
-            self.old_objects = {}
-            self.frame_count = 0
+            self.pipeline.set_source(self.video_path)
+            self.pipeline.reset()
             
             # Cập nhật UI hiển thị tên file ngắn gọn
             filename = file_path.split('/')[-1]
@@ -243,91 +269,86 @@ class PeopleCounterUI:
                 self.show_image(frame)
                 self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0) # Reset về đầu
 
-    def update_frame(self):
-        if not self.is_running:
-            return
-        
-        ret, frame = self.cap.read()
-        if not ret:
-            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
-            self.frame_count = 0
-            self.root.after(1, self.update_frame)
-            return
-        
-        # Skip frames để tăng tốc độ
-        self.frame_count += 1
-        if self.frame_count % (self.skip_frames + 1) != 0:
-            self.root.after(1, self.update_frame)
-            return
-        
-        frame = cv2.resize(frame, (640, 480))
-        LINE_Y = 240
-        
-        fg_mask = self.subtractor.apply(frame)
-        th = apply_threshold(fg_mask)
-        clean = clean_mask(th)
-        boxes = detect_people(clean)
-        objects = self.tracker.update(boxes)
-        
-        self.total += count_people(objects, self.old_objects, LINE_Y, self.counted_ids)
-        self.old_objects = objects.copy()
-        
-        draw_line(frame, LINE_Y)
-        for obj_id, (cx, cy) in objects.items():
-            for box in boxes:
-                bx, by, bw, bh = box
-                if bx < cx < bx+bw and by < cy < by+bh:
-                    draw_box(frame, box, obj_id)
-        
-        # UI Overlay trên video (tùy chọn, vì đã có label bên ngoài)
-        # cv2.putText(frame, f"Count: {self.total}", (20, 40), cv2.FONT_HERSHEY_SIMPLEX, 1.2, (0,255,0), 3)
-        
-        self.show_image(frame)
-        self.count_label.config(text=f"{self.total}")
-        
-        self.root.after(1, self.update_frame)
+    def process_frames(self, prefetcher):
+        """Chạy trên thread riêng: xử lý nhanh nhất có thể, không phụ thuộc tốc độ hiển thị"""
+        last_index = -1
+        while self.is_running:
+            # Frame đã được giải mã sẵn trên thread nền (bỏ frame bằng grab() khi tăng tốc)
+            ret, frame = prefetcher.read(timeout=0.1)
+            if not ret:
+                if prefetcher.finished:
+                    break
+                continue
+
+            # số frame nguồn từ frame xử lý trước (cho tracker dự đoán chuyển động)
+            dt = max(1, prefetcher.last_index - last_index)
+            last_index = prefetcher.last_index
+
+            with self.pipeline_lock:
+                t0 = time.perf_counter()
+                frame = self.pipeline.process(frame, dt=dt).frame
+                total = self.pipeline.total
+                if self.scheduler:
+                    self.scheduler.observe(time.perf_counter() - t0)
+
+            # UI Overlay trên video (tùy chọn, vì đã có label bên ngoài)
+            # cv2.putText(frame, f"Count: {total}", (20, 40), cv2.FONT_HERSHEY_SIMPLEX, 1.2, (0,255,0), 3)
+
+            self.renderer.submit(frame, total)
+            self.metrics.set_counter("frames_dropped", prefetcher.dropped)
+
+    def on_display_tick(self, total):
+        """Gọi trên thread Tk mỗi lần renderer vẽ (tối đa DISPLAY_MAX_FPS lần/giây)"""
+        if total is not None:
+            self.count_label.config(text=f"{total}")
+        if self.scheduler:
+            self.speed_label.config(text=self.scheduler.current.name)
+        # Thread xử lý kết thúc (hết video / mất camera)
+        if self.is_running and self.worker and not self.worker.is_alive():
+            self.stop_video()
 
     def show_image(self, frame):
-        """Hàm phụ trợ để hiển thị ảnh lên Label"""
-        # Resize frame để vừa khít với khung hình hiện tại của UI nếu cần
-        # Ở đây giữ cố định 640x480 để logic vẽ không bị lệch, 
-        # nhưng khi hiển thị lên GUI có thể dùng thuật toán fill
-        
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        img = Image.fromarray(rgb_frame)
-        
-        # Resize ảnh cho vừa với khung hiển thị (Responsive nhẹ)
-        display_w = self.video_label.winfo_width()
-        display_h = self.video_label.winfo_height()
-        
-        if display_w > 10 and display_h > 10:
-             # Giữ tỷ lệ khung hình
-             img.thumbnail((display_w, display_h), Image.Resampling.LANCZOS)
-             
-        imgtk = ImageTk.PhotoImage(image=img)
-        self.video_label.imgtk = imgtk
-        self.video_label.config(image=imgtk, text="") # Xóa text placeholder
+        """Hàm phụ trợ để hiển thị ảnh lên Label (thumbnail, frame đầu tiên)"""
+        self.renderer.show(frame)
 
     def start_video(self):
         if not self.is_running:
+            # Video file: quay lại từ đầu khi hết; camera: bỏ frame cũ để không bị trễ
+            self.prefetcher = FramePrefetcher(self.cap, stride=self.skip_frames + 1,
+                                              drop_oldest=self.is_live,
+                                              loop=not self.is_live).start()
             self.is_running = True
-            self.update_frame()
+            if self.auto_var.get():
+                self.scheduler = self.create_scheduler()
+            self.worker = threading.Thread(target=self.process_frames,
+                                           args=(self.prefetcher,), daemon=True)
+            self.worker.start()
+            self.renderer.start()
 
     def stop_video(self):
         self.is_running = False
+        if self.worker:
+            self.worker.join()
+            self.worker = None
+        if self.prefetcher:
+            self.prefetcher.stop()
+            self.prefetcher = None
+        if self.scheduler:
+            self.scheduler.reset()
+            self.scheduler = None
+        self.renderer.stop()
 
     def reset_counter(self):
-        self.total = 0
-        self.counted_ids = set()
-        self.frame_count = 0
-        self.old_objects = {}
         self.count_label.config(text="0")
+        self.renderer.last_info = None
         
         # Reset tracker & subtractor để tránh lỗi logic khi đếm lại
-        self.tracker = CentroidTracker()
-        self.subtractor = create_subtractor()
+        with self.pipeline_lock:
+            self.pipeline.reset()
 
 def run_ui():
     root = tk.Tk()
     ui = PeopleCounterUI(root)
-    root.mainloop()
\ No newline at end of file
+    root.mainloop()
+    if ui.events:
+        ui.events.close()
\ No newline at end of file
@@ -0,0 +1,100 @@
+import time
+
+import cv2
+import numpy as np
+from PIL import Image, ImageTk
+
+from src.utils.config import DISPLAY_MAX_FPS
+from src.utils.triple_buffer import TripleBuffer
+from src.utils.logger import NullMetrics
+
+
+class DisplayRenderer:
+    """
+    Hiển thị frame lên tk.Label với FPS tối đa cố định, tách khỏi tốc độ xử lý.
+    Thread xử lý gọi submit() (không chặn), vòng after() của Tk chỉ vẽ frame mới nhất.
+    Kích thước hiển thị được tính lại chỉ khi cửa sổ đổi kích thước; resize + đổi màu
+    ghi vào buffer có sẵn và PhotoImage được dùng lại (paste) thay vì tạo mới mỗi frame.
+    """
+
+    def __init__(self, label, max_fps=DISPLAY_MAX_FPS, on_tick=None, metrics=None):
+        self.label = label
+        self.interval_ms = max(1, int(1000 / max_fps))
+        self.on_tick = on_tick
+        self.metrics = metrics or NullMetrics()
+        self.buffer = TripleBuffer()
+        self.last_info = None
+        self._job = None
+        self._running = False
+
+        self._size_key = None     # (rộng label, cao label, shape frame)
+        self._target = None
+        self._resized = None
+        self._rgb = None
+        self._photo = None
+
+    def submit(self, frame, info=None):
+        """Gọi từ thread xử lý: frame được copy nên có thể là buffer dùng lại"""
+        self.buffer.put(frame, info)
+
+    def start(self):
+        if not self._running:
+            self._running = True
+            self._tick()
+
+    def stop(self):
+        # có thể được gọi ngay trong on_tick: _tick không đặt lịch lại sau đó
+        self._running = False
+        if self._job is not None:
+            self.label.after_cancel(self._job)
+            self._job = None
+
+    def _tick(self):
+        self._job = None
+        frame, info = self.buffer.take()
+        if frame is not None:
+            self.show(frame)
+            self.last_info = info
+        if self.on_tick:
+            self.on_tick(self.last_info)
+        if self._running:
+            self._job = self.label.after(self.interval_ms, self._tick)
+
+    def _target_size(self, frame):
+        display_w = self.label.winfo_width()
+        display_h = self.label.winfo_height()
+        key = (display_w, display_h, frame.shape)
+        if key != self._size_key:
+            self._size_key = key
+            fh, fw = frame.shape[:2]
+            if display_w > 10 and display_h > 10:
+                # Giữ tỷ lệ khung hình
+                scale = min(display_w / fw, display_h / fh)
+                self._target = (max(1, int(fw * scale)), max(1, int(fh * scale)))
+            else:
+                self._target = (fw, fh)
+            tw, th = self._target
+            self._resized = np.empty((th, tw, 3), np.uint8)
+            self._rgb = np.empty((th, tw, 3), np.uint8)
+            self._photo = None
+        return self._target
+
+    def show(self, frame):
+        """Vẽ ngay một frame (chỉ gọi trên thread Tk)"""
+        t0 = time.perf_counter()
+        target = self._target_size(frame)
+        if target == (frame.shape[1], frame.shape[0]):
+            np.copyto(self._resized, frame)
+        else:
+            shrink = target[0] < frame.shape[1]
+            cv2.resize(frame, target, dst=self._resized,
+                       interpolation=cv2.INTER_AREA if shrink else cv2.INTER_LINEAR)
+        cv2.cvtColor(self._resized, cv2.COLOR_BGR2RGB, dst=self._rgb)
+        img = Image.fromarray(self._rgb)
+
+        if self._photo is None:
+            self._photo = ImageTk.PhotoImage(image=img)
+            self.label.config(image=self._photo, text="")  # Xóa text placeholder
+        else:
+            self._photo.paste(img)
+        self.metrics.record("render", time.perf_counter() - t0)